@@ -1,28 +1,41 @@
 import os
 import json
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Iterator, Optional
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine, Row
-from database_manager import DatabaseManager
-from api_manager import APIManager
-from opgg_scrapper import get_previous_rank
-from utils import RequestError
+from database_manager import DatabaseManager, AsyncDatabaseManager
+from api_manager import APIManager, DEFAULT_PLATFORM
+from opgg_scrapper import get_previous_rank, OPGG_REGIONS, OPGG_ROUTE, OPGG_RATE_LIMITS
+from utils import RequestError, TaskGroup, get_config_hash
+from traffic_corpus import TrafficCorpus, CAPTURE
+from scheduler import QueueScheduler
 from collections import defaultdict
 import asyncio
+import bisect
+import copy
+import itertools
 import math
 import random
+import time
+
+DB_POOL_SIZE: int = 4 # Connexions MySQL et threads dédiés aux requêtes BDD.
+BACKFILL_WINDOW: int = 7 * 24 * 3600 # Secondes par fenêtre de recherche de games après max_date.
+BACKFILL_MAX_WINDOW: int = 30 * 24 * 3600 # Plafond du doublement des fenêtres vides : une reprise après une longue pause ne liste pas des mois d'un coup.
+BACKFILL_STAGGER: Tuple[float, float] = (0.05, 0.05) # Délai entre deux games lancées en complément, le rythme est donné par les limiteurs (API et op.gg).
 
 class Game:
     """Données d'une game."""
 
     def __init__(self, api_manager, game_id: str, is_new: bool, game_date: Optional[str] = None, is_soloq: Optional[bool] = None,
         win_points_count: Optional[int] = None, lose_points_count: Optional[int] = None, is_solo: Optional[bool] = None, is_win: Optional[bool] = None,
-        players: Optional[List[str]] = None, enemy_players: Optional[List[str]] = None
+        players: Optional[List[str]] = None, enemy_players: Optional[List[str]] = None, platform: str = DEFAULT_PLATFORM
     ) -> None:
         self.api_manager: APIManager = api_manager
+        self.platform: str = platform # Plateforme du joueur, partagée par tous les participants de la game.
         self.game_id: str = game_id
         self.is_new: bool = is_new
         self.game_date: Optional[str] = game_date
+        self.timestamp: int = 0 if game_date is None else int(game_date) # Date convertie une seule fois pour les tris.
         self.is_soloq: Optional[bool] = is_soloq
         self.win_points_count: Optional[int] = win_points_count
         self.lose_points_count: Optional[int] = lose_points_count
@@ -42,9 +55,9 @@ class Game:
 
     async def get_participant_solo_rank_value(self, participant: str) -> Optional[float]:
         try:
-            participant: Any = await self.api_manager.get_profile_from_puuid(participant)
+            participant: Any = await self.api_manager.get_profile_from_puuid(participant, self.platform)
             participant_id = participant["id"]
-            rank_data: Any = await self.api_manager.get_elo(participant_id)
+            rank_data: Any = await self.api_manager.get_elo(participant_id, self.platform)
             solo_rank: dict[str, str] = next((data for data in rank_data if data["queueType"] == "RANKED_SOLO_5x5"), None)
             return self.get_participant_value(solo_rank) if solo_rank else None
         except RequestError:
@@ -53,24 +66,34 @@ class Game:
             return None
 
     async def get_participant_old_solo_rank_value(self, participant: str) -> Optional[float]: # Scrapping via op.gg si début de saison.
+        region: str = OPGG_REGIONS[self.platform] # Plateforme validée par get_players_in_queue.
         try:
-            participant_data: Optional[Any] = await self.api_manager.get_tag_from_puuid(participant)
+            participant_data: Optional[Any] = await self.api_manager.get_tag_from_puuid(participant, self.platform)
             participant_name: str = f"""{participant_data["gameName"]}#{participant_data["tagLine"]}"""
-            solo_rank: dict[str, str] = await get_previous_rank(self.api_manager.session, participant_name)
+            solo_rank: dict[str, str] = await get_previous_rank(
+                self.api_manager.session, participant_name, region = region, corpus = self.api_manager.corpus,
+                limiter = self.api_manager.get_limiter(OPGG_ROUTE, OPGG_RATE_LIMITS)
+            )
             return self.get_participant_value(solo_rank) if solo_rank else None
-        except RequestError:
-            raise
-        except Exception:
+        except (TypeError, KeyError): # Compte introuvable, sans Riot ID ou rang op.gg incomplet.
             return None
 
-    async def add_points_count(self) -> bool:
+    async def add_points_count(self, database_manager: Optional[AsyncDatabaseManager] = None) -> bool:
         valid_players: int = 0
         total_value: float = 0
-        tasks = []
-        for participant in self.enemy_players:
-            tasks.append(asyncio.create_task(self.get_participant_old_solo_rank_value(participant)))
-            await asyncio.sleep(0.2)
-        participants_values: List[float] = [task.result() for task in (await asyncio.wait(tasks, return_when = asyncio.FIRST_EXCEPTION))[0]]
+        ladder_ranks: Dict[str, dict[str, str|int]] = ( # Snapshot local de fin de saison, voir ladder_snapshot.py.
+            {} if database_manager is None else await database_manager.get_ladder_ranks(self.enemy_players)
+        )
+        participants_values: List[float] = [self.get_participant_value(ladder_ranks[participant]) for participant in self.enemy_players if participant in ladder_ranks]
+        async with TaskGroup() as task_group: # Requêtes réseau uniquement pour les joueurs absents du snapshot.
+            for participant in self.enemy_players:
+                if participant in ladder_ranks:
+                    continue
+                if task_group.failed:
+                    break
+                task_group.create_task(self.get_participant_old_solo_rank_value(participant))
+                await asyncio.sleep(0.2)
+        participants_values += task_group.results()
         for participant_value in participants_values:
             if participant_value:
                 valid_players += 1
@@ -87,62 +110,125 @@ class Game:
     def remove_players(self) -> None:
         self.players.clear()
 
+class GamesStore:
+    """
+    Games d'un joueur indexées par id et triées par date.
+    Le statut solo/premade est porté par chaque game, le passage en premade ne déplace donc aucune game et se fait en O(1).
+    """
+
+    def __init__(self) -> None:
+        self._games: Dict[str, Game] = {}
+        self._timeline: List[Tuple[int, str]] = [] # (timestamp, game_id) du plus ancien au plus récent.
+        self.solo_number: int = 0
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._games
+
+    def __iter__(self) -> Iterator[Game]: # Du plus récent au plus ancien.
+        return (self._games[game_id] for _, game_id in reversed(self._timeline))
+
+    @property
+    def premade_number(self) -> int:
+        return len(self._games) - self.solo_number
+
+    def add(self, game: Game) -> None:
+        if game.game_id in self._games:
+            return
+        bisect.insort(self._timeline, (game.timestamp, game.game_id))
+        self._games[game.game_id] = game
+        if game.is_solo:
+            self.solo_number += 1
+
+    def remove(self, game: Game) -> None:
+        del self._timeline[bisect.bisect_left(self._timeline, (game.timestamp, game.game_id))]
+        del self._games[game.game_id]
+        if game.is_solo:
+            self.solo_number -= 1
+
+    def move_to_premade(self, game: Game) -> None:
+        if game.is_solo:
+            game.change_solo_to_premade()
+            self.solo_number -= 1
+
+    def nth_most_recent(self, index: int) -> Game:
+        return self._games[self._timeline[-1 - index][1]]
+
+    def most_recent(self, is_solo: bool, number: int) -> List[Game]: # Parcours arrêté dès que le nombre de games est atteint.
+        return list(itertools.islice((game for game in self if bool(game.is_solo) == is_solo), number))
+
+    def solo_games(self) -> List[Game]:
+        return [game for game in self if game.is_solo]
+
+    def premade_games(self) -> List[Game]:
+        return [game for game in self if not game.is_solo]
+
+    def clear(self) -> None:
+        self._games.clear()
+        self._timeline.clear()
+        self.solo_number = 0
+
 class Player:
     """Données d'un joueur."""
 
-    def __init__(self, api_manager: APIManager, puuid: str, points_count: float) -> None:
+    def __init__(self, api_manager: APIManager, puuid: str, points_count: float, platform: str = DEFAULT_PLATFORM,
+        database_manager: Optional[AsyncDatabaseManager] = None
+    ) -> None:
         self.api_manager: APIManager = api_manager
+        self.database_manager: Optional[AsyncDatabaseManager] = database_manager # Rangs des adversaires lus en local en priorité.
         self.puuid: str = puuid
+        self.platform: str = platform
         self.points_count: float = points_count
         self.point_count_recap: Optional[str] = None
-        self.premades_check: List[str] = []
-        self.premades: List[str] = []
-        self.solo_games: List[Game] = []
-        self.premade_games: List[Game] = []
+        self.last_match_id: Optional[str] = None # Game la plus récente de la fenêtre, enregistrée avec le score.
+        self.premades_check: set[str] = set()
+        self.premades: set[str] = set()
+        self.games: GamesStore = GamesStore()
+
+    @property
+    def solo_games(self) -> List[Game]: # Du plus récent au plus ancien.
+        return self.games.solo_games()
+
+    @property
+    def premade_games(self) -> List[Game]: # Du plus récent au plus ancien.
+        return self.games.premade_games()
 
     def add_previous_games(self, previous_games: List[Row]) -> None:
         for game_db in previous_games:
             game: Game = Game(
                 self.api_manager, game_db.riot_game_id, False, game_db.game_date, game_db.is_soloq,
                 game_db.win_points_count, game_db.lose_points_count,
-                game_db.is_solo, game_db.is_win, None, None
+                game_db.is_solo, game_db.is_win, None, None, platform = self.platform
             )
-            if game.is_solo:
-                self.solo_games.append(game)
-            else:
-                self.premade_games.append(game)
+            self.games.add(game)
 
     async def get_games_ids_list(self, update_time: int|str, end_time: Optional[int|str]) -> List[str]:
         full_games_ids_list: List[str] = []
         part_games_ids_list: Optional[List[str]] = None
         index_start: int = 0
-        while part_games_ids_list != []:
-            part_games_ids_list = await self.api_manager.get_matches_list(self.puuid, update_time = update_time,  end_time = end_time, index_start = index_start, count = 100)
+        while part_games_ids_list is None or len(part_games_ids_list) == 100: # Une page incomplète est la dernière.
+            part_games_ids_list = await self.api_manager.get_matches_list(self.puuid, update_time = update_time,  end_time = end_time, index_start = index_start, count = 100, platform = self.platform)
             full_games_ids_list += part_games_ids_list
             index_start += 100
             await asyncio.sleep(random.uniform(0.2, 0.4))
-        previous_games_ids = {game.game_id for game in self.solo_games + self.premade_games}
-        cleared_full_games_ids_list: List[str] = [game_id for game_id in full_games_ids_list if game_id not in previous_games_ids]
+        cleared_full_games_ids_list: List[str] = [game_id for game_id in full_games_ids_list if game_id not in self.games]
         return cleared_full_games_ids_list
 
-    async def update_premades(self, participant: str) -> None:
-        lock = asyncio.Lock()
-        if participant in self.premades:
-            return
-        elif participant in self.premades_check:
-            async with lock:
-                self.premades.append(participant)
+    async def update_premades(self, participant: str) -> None: # Premade dès la deuxième game en commun.
+        if participant in self.premades_check:
+            self.premades.add(participant)
         else:
-            async with lock:
-                self.premades_check.append(participant)
+            self.premades_check.add(participant)
 
     async def update_previous_games(self) -> List[Game]:
         previous_solo_games_to_verify: List[Game] = []
         semaphore = asyncio.Semaphore(10)
         async def process_game(game):
             async with semaphore:
-                print(f"\rNombre de games traitées : {len(self.solo_games) + len(self.premade_games)} ", end="")
-                game_data: Any = await self.api_manager.get_game_data(game.game_id)
+                print(f"\rNombre de games traitées : {len(self.games)} ", end="")
+                game_data: Any = await self.api_manager.get_game_data(game.game_id, self.platform)
                 solo_game_verif: bool = game.is_solo and not game.is_soloq
                 for participant in game_data["metadata"]["participants"]:
                     if participant != self.puuid:
@@ -151,25 +237,25 @@ class Player:
                             game.players.append(participant)
                 if solo_game_verif:
                     return game
-        tasks = []
-        for game in self.solo_games + self.premade_games:
-            tasks.append(asyncio.create_task(process_game(game)))
-            await asyncio.sleep(0.05)
-        if tasks:
-            games: List[Game] = [task.result() for task in (await asyncio.wait(tasks, return_when = asyncio.FIRST_EXCEPTION))[0]]
-            for game in games:
-                if game:
-                    previous_solo_games_to_verify.append(game)
+        async with TaskGroup() as task_group:
+            for game in list(self.games):
+                if task_group.failed:
+                    break
+                task_group.create_task(process_game(game))
+                await asyncio.sleep(0.05)
+        for game in task_group.results():
+            if game:
+                previous_solo_games_to_verify.append(game)
         return previous_solo_games_to_verify
 
     async def analyze_game_data(self, game_data: Any) -> dict[str, bool|List[str]]:
-        player_index = game_data["metadata"]["participants"].index(self.puuid)
+        participants: List[str] = game_data["metadata"]["participants"]
+        player_index = participants.index(self.puuid)
         is_win = game_data["info"]["participants"][player_index]["win"]
         players = []
         enemy_players = []
-        for participant in game_data["metadata"]["participants"]:
+        for participant_index, participant in enumerate(participants):
             if participant != self.puuid:
-                participant_index = game_data["metadata"]["participants"].index(participant)
                 players.append(participant)
                 if game_data["info"]["participants"][participant_index]["win"] != is_win:
                     enemy_players.append(participant)
@@ -191,96 +277,121 @@ class Player:
             is_solo = True,
             is_win = game_info["is_win"],
             players = game_info["players"],
-            enemy_players = game_info["enemy_players"]
+            enemy_players = game_info["enemy_players"],
+            platform = self.platform
         )
 
     async def add_existing_games(self, game_db: Row) -> Optional[Game]:
-        print(f"\rNombre de games traitées : {len(self.solo_games) + len(self.premade_games)} ", end="")
-        game_data: Any = await self.api_manager.get_game_data(game_db.riot_game_id)
+        print(f"\rNombre de games traitées : {len(self.games)} ", end="")
+        game_data: Any = await self.api_manager.get_game_data(game_db.riot_game_id, self.platform)
         game_info: dict[str, bool|List[str]] = await self.analyze_game_data(game_data)
         if (game_info["is_win"] and game_db.win_points_count) or (not game_info["is_win"] and game_db.lose_points_count):
             game: Game = Game(
                 self.api_manager, game_db.riot_game_id, True, game_db.game_date, game_db.is_soloq,
-                game_db.win_points_count, game_db.lose_points_count, True, game_info["is_win"], game_info["players"], None
+                game_db.win_points_count, game_db.lose_points_count, True, game_info["is_win"], game_info["players"], None, platform = self.platform
             )
-            lock = asyncio.Lock()
-            async with lock:
-                self.solo_games.append(game)
+            self.games.add(game)
             return game
 
-    async def add_new_games(self, games_ids_list: List[str]) -> List[Game]:
+    async def add_new_games(self, games_ids_list: List[str], stagger: Tuple[float, float] = (1/3, 2/3)) -> List[Game]:
         new_solo_games_to_verify: List[Game] = []
         semaphore = asyncio.Semaphore(10)
-        lock = asyncio.Lock()
         async def process_game(game_id: str) -> Optional[Game]:
             async with semaphore:
-                print(f"\rNombre de games traitées : {len(self.solo_games) + len(self.premade_games)} ", end="")
+                print(f"\rNombre de games traitées : {len(self.games)} ", end="")
                 try:
-                    game_data: Any = await self.api_manager.get_game_data(game_id)
+                    game_data: Any = await self.api_manager.get_game_data(game_id, self.platform)
                     if game_data["info"]["queueId"] not in [400, 420, 430, 440, 480, 490]:
                         return None
                     is_soloq: bool = game_data["info"]["queueId"] == 420
                     game: Game = await self.create_new_game(game_data, game_id, is_soloq)
-                    security_check: bool = await game.add_points_count()
+                    security_check: bool = await game.add_points_count(self.database_manager)
                     if not security_check:
                         del game
                         return None
-                    async with lock:
-                        self.solo_games.append(game)
+                    self.games.add(game)
                     if not is_soloq:
                         return game
                 except RequestError:
                     raise
                 except Exception:
                     return None
-        tasks = []
-        for game_id in games_ids_list:
-            tasks.append(asyncio.create_task(process_game(game_id)))
-            await asyncio.sleep(random.uniform(1/3, 2/3))
-        if tasks:
-            games: List[Game] = [task.result() for task in (await asyncio.wait(tasks, return_when = asyncio.FIRST_EXCEPTION))[0]]
-            for game in games:
-                if game:
-                    new_solo_games_to_verify.append(game)
+        async with TaskGroup() as task_group:
+            for game_id in games_ids_list:
+                if task_group.failed:
+                    break
+                task_group.create_task(process_game(game_id))
+                await asyncio.sleep(random.uniform(*stagger))
+        for game in task_group.results():
+            if game:
+                new_solo_games_to_verify.append(game)
         return new_solo_games_to_verify
 
     def move_solo_game_to_premade_games(self, game: Game) -> None:
-        self.solo_games.remove(game)
-        self.premade_games.append(game)
-        game.change_solo_to_premade()
+        self.games.move_to_premade(game)
         game.remove_players()
 
     def premade_checking(self, solo_games_to_verify: List[Game]) -> None:
-        games_to_move = []
+        games_to_keep = []
         for game in solo_games_to_verify:
             if any(participant != self.puuid and participant in self.premades for participant in game.players):
-                games_to_move.append(game)
-        for game in games_to_move:
-            self.move_solo_game_to_premade_games(game)
-            solo_games_to_verify.remove(game)
- 
-    def sort_games_by_timestamp(self) -> None:
-        self.solo_games.sort(key = lambda game: int(game.game_date), reverse = True)
-        self.premade_games.sort(key = lambda game: int(game.game_date), reverse = True)
+                self.move_solo_game_to_premade_games(game)
+            else:
+                games_to_keep.append(game)
+        solo_games_to_verify[:] = games_to_keep # Liste partagée avec l'appelant.
 
     def clear_games(self) -> None:
-        self.solo_games.clear()
-        self.premade_games.clear()
+        self.games.clear()
 
 class Main:
     """Script principal."""
 
-    def __init__(self, **config: int|float) -> None:
-        database_path: str = os.environ.get("DB_2R2T_PATH")
-        api_key: str = os.environ.get("RIOT_API_KEY")
-        engine: Engine = create_engine(database_path)
-        self.database_manager: DatabaseManager = DatabaseManager(engine)
-        self.api_manager: APIManager = APIManager(api_key)
+    def __init__(self, database_manager: Optional[AsyncDatabaseManager] = None, api_manager: Optional[APIManager] = None, **config: int|float) -> None:
+        if database_manager is None:
+            database_path: str = os.environ.get("DB_2R2T_PATH")
+            engine: Engine = create_engine(database_path, pool_size = DB_POOL_SIZE, max_overflow = 0, pool_pre_ping = True, pool_recycle = 3600)
+            database_manager = AsyncDatabaseManager(
+                DatabaseManager(engine, config["games_min_solo"], config["games_min_total"]), max_workers = DB_POOL_SIZE
+            )
+        if api_manager is None:
+            api_key: str = os.environ.get("RIOT_API_KEY")
+            api_manager = APIManager(api_key)
+        self.database_manager: AsyncDatabaseManager = database_manager
+        self.api_manager: APIManager = api_manager
         self.config: Dict[str, int|float] = config
+        self.config_hash: str = get_config_hash(config)
+        self.corpus_mode: Optional[str] = os.environ.get("CORPUS_2R2T_MODE") # "capture" pour enregistrer chaque traitement de joueur.
+        self.corpus_path: str = os.environ.get("CORPUS_2R2T_PATH", "corpus")
+        self.schedulers: Dict[str, QueueScheduler] = {} # Par plateforme, conservés d'un run à l'autre pour le vieillissement.
+
+    async def start(self) -> None:
+        """Préchauffage des pools de connexions BDD et HTTP avant le premier joueur."""
+        await asyncio.gather(
+            self.database_manager.warm_up(DB_POOL_SIZE),
+            self.api_manager.warm_up([DEFAULT_PLATFORM])
+        )
 
-    def create_player(self, player_db: Row) -> None:
-        self.player: Player = Player(self.api_manager, player_db.riot_puuid, player_db.points_count)
-        previous_games: List[Row] = self.database_manager.get_previous_games(self.player.puuid)
+    def start_capture(self, player_db: Row) -> None:
+        if self.corpus_mode != CAPTURE:
+            return
+        os.makedirs(self.corpus_path, exist_ok = True)
+        corpus_file: str = os.path.join(self.corpus_path, f"{player_db.riot_puuid}_{int(time.time())}.json.gz")
+        corpus: TrafficCorpus = TrafficCorpus(CAPTURE, corpus_file, player_db._asdict())
+        self.api_manager.corpus = corpus
+        self.database_manager.corpus = corpus
+
+    def stop_capture(self) -> None:
+        corpus: Optional[TrafficCorpus] = self.api_manager.corpus
+        if corpus is None or not corpus.is_capture:
+            return
+        corpus.save()
+        print(f"Corpus enregistré : {corpus.path}")
+        self.api_manager.corpus = None
+        self.database_manager.corpus = None
+
+    async def create_player(self, player_db: Row) -> None:
+        self.player: Player = Player(self.api_manager, player_db.riot_puuid, player_db.points_count, player_db.platform, self.database_manager)
+        previous_games: List[Row] = await self.database_manager.get_previous_games(self.player.puuid)
         self.player.add_previous_games(previous_games)
 
     def verif_games_number(self, min_case: bool = True) -> Dict[str, bool]: # min = True pour le nombre minimum, False dans le cas d'une première update.
@@ -291,52 +402,53 @@ class Main:
             seuil_solo: int = self.config["games_min_total"]
             seuil_total: int = self.config["games_max_total"]
         return {
-            "solo": len(self.player.solo_games) >= seuil_solo,
-            "total": len(self.player.solo_games) + len(self.player.premade_games) >= seuil_total
+            "solo": self.player.games.solo_number >= seuil_solo,
+            "total": len(self.player.games) >= seuil_total
         }
 
-    def write_current_player_duration(self, ign: str, games_number: int) -> None:
+    async def write_current_player_duration(self, ign: str, games_number: int) -> None:
         duration: int = round(games_number * 1.1)
-        self.database_manager.update_current_player(ign, duration)
+        await self.database_manager.update_current_player(ign, duration, self.player.platform)
 
-    async def verify_and_add_existing_games(self, games_ids_list: List[str], solo_games_to_verify: List[Game]) -> None:
-        existing_games: List[Row] = self.database_manager.get_existing_games(games_ids_list) # Traitement des games joués par d'autres joueurs.
-        if existing_games:
+    async def verify_and_add_existing_games(self, games_ids_list: List[str], solo_games_to_verify: List[Game], existing_games: List[Row]) -> None:
+        if existing_games: # Traitement des games joués par d'autres joueurs.
             semaphore = asyncio.Semaphore(10)
             async def add_existing_games_limiter(game_db: Row) -> Optional[Game]:
                 async with semaphore:
                     return await self.player.add_existing_games(game_db)
-            tasks = []
-            for game_db in existing_games:
-                tasks.append(asyncio.create_task(add_existing_games_limiter(game_db)))
-                await asyncio.sleep(0.05)
-            if tasks:
-                games: List[Game] = [task.result() for task in (await asyncio.wait(tasks, return_when = asyncio.FIRST_EXCEPTION))[0]]
-                for game in games:
-                    if game:
-                        if not game.is_soloq:
-                            solo_games_to_verify.append(game)
-                        if game.game_id in games_ids_list:
-                            games_ids_list.remove(game.game_id)
-                self.player.premade_checking(solo_games_to_verify)
+            async with TaskGroup() as task_group:
+                for game_db in existing_games:
+                    if task_group.failed:
+                        break
+                    task_group.create_task(add_existing_games_limiter(game_db))
+                    await asyncio.sleep(0.05)
+            for game in task_group.results():
+                if game:
+                    if not game.is_soloq:
+                        solo_games_to_verify.append(game)
+                    if game.game_id in games_ids_list:
+                        games_ids_list.remove(game.game_id)
+            self.player.premade_checking(solo_games_to_verify)
 
     async def games_update(self) -> List[Game]:
         print("Nombre de games traitées : 0 ", end="")
         solo_games_to_verify: List[Game] = []
-        profile: Any = await self.api_manager.get_tag_from_puuid(self.player.puuid)
+        profile: Any = await self.api_manager.get_tag_from_puuid(self.player.puuid, self.player.platform)
         ign: str = f"""{profile["gameName"]}#{profile["tagLine"]}"""
         updated_at: int = (
             self.config["min_date"] if self.player.points_count < 0.5 else
-            sorted(
-                [int(game.game_date) for game in self.player.solo_games + self.player.premade_games], reverse = True
-            )[self.config["games_min_total"] - 1] + 1 # Seulement les games + récentes que la dernière considérée dans le calcul.
+            self.player.games.nth_most_recent(self.config["games_min_total"] - 1).timestamp + 1 # Seulement les games + récentes que la dernière considérée dans le calcul.
         )
         games_ids_list: List[str] = await self.player.get_games_ids_list(updated_at, self.config["max_date"])
-        self.write_current_player_duration(ign, len(games_ids_list))
+        await self.write_current_player_duration(ign, len(games_ids_list))
         verification_min: Dict[str, bool] = self.verif_games_number()
         if games_ids_list or not verification_min["solo"] or not verification_min["total"]:
-            solo_games_to_verify += await self.player.update_previous_games()
-            await self.verify_and_add_existing_games(games_ids_list, solo_games_to_verify)
+            previous_solo_games_to_verify, existing_games = await asyncio.gather(
+                self.player.update_previous_games(),
+                self.database_manager.get_existing_games(games_ids_list) # Lecture BDD en parallèle des requêtes API.
+            )
+            solo_games_to_verify += previous_solo_games_to_verify
+            await self.verify_and_add_existing_games(games_ids_list, solo_games_to_verify, existing_games)
             for i in range(0, len(games_ids_list), 50):
                 solo_games_to_verify += await self.player.add_new_games(games_ids_list[i:i+50])
                 self.player.premade_checking(solo_games_to_verify)
@@ -346,45 +458,50 @@ class Main:
                 await asyncio.sleep(5) # Uniquement si utilisation de l'op.gg scrapper.
         return solo_games_to_verify
 
+    def get_missing_games_number(self) -> int:
+        return max(self.config["games_min_solo"] - self.player.games.solo_number, self.config["games_min_total"] - len(self.player.games), 0)
+
     async def ensure_minimum_games(self, solo_games_to_verify: List[Game]) -> None:
-        verification_min: Dict[str, bool] = self.verif_games_number()
-        while not verification_min["solo"] or not verification_min["total"]:
-            games_ids_list = await self.player.get_games_ids_list(self.config["max_date"], None)
-            if not games_ids_list:
-                break
-            games_ids_list.reverse()  # Plus ancien au plus récent
-            for game_id in games_ids_list:
-                solo_games_to_verify += await self.player.add_new_games([game_id])
+        """
+        Complète avec les games jouées après max_date, des plus anciennes aux plus récentes.
+        Chaque fenêtre de temps n'est listée qu'une fois, ses games sont traitées en parallèle par paquets de la taille du manque,
+        jusqu'à ce que le minimum soit atteint.
+        """
+        window_start: int = self.config["max_date"] + 1 # Les bornes de get_matches_list sont incluses : max_date est déjà listée.
+        window: int = BACKFILL_WINDOW
+        while self.get_missing_games_number() and window_start < time.time():
+            window_end: int = window_start + window - 1
+            games_ids_list: List[str] = await self.player.get_games_ids_list(window_start, window_end)
+            if not games_ids_list: # Période sans game : fenêtre suivante doublée, dans la limite de BACKFILL_MAX_WINDOW.
+                window = min(window * 2, BACKFILL_MAX_WINDOW)
+            games_ids_list.reverse() # Plus ancien au plus récent.
+            while games_ids_list and self.get_missing_games_number():
+                games_number: int = self.get_missing_games_number()
+                solo_games_to_verify += await self.player.add_new_games(games_ids_list[:games_number], stagger = BACKFILL_STAGGER)
+                del games_ids_list[:games_number]
                 self.player.premade_checking(solo_games_to_verify)
-                verification_min = self.verif_games_number()
+            window_start = window_end + 1
 
     def clean_up_excess_games(self) -> None:
-        all_games: List[Game] = self.player.solo_games + self.player.premade_games
-        all_games.sort(key = lambda game: int(game.game_date), reverse = True)
-        while len(self.player.solo_games) + len(self.player.premade_games) > self.config["games_min_total"]:
-            game: Game = all_games.pop(0)
-            if int(game.game_date) > self.config["max_date"]:
-                if game.is_solo:
-                    if len(self.player.solo_games) > self.config["games_min_solo"]:
-                        self.player.solo_games.remove(game)
-                else:
-                    self.player.premade_games.remove(game)
-            else:
+        for game in list(self.player.games): # Du plus récent au plus ancien.
+            if len(self.player.games) <= self.config["games_min_total"] or game.timestamp <= self.config["max_date"]:
                 break
+            if not game.is_solo or self.player.games.solo_number > self.config["games_min_solo"]:
+                self.player.games.remove(game)
 
     def initialize_points_count(self, is_max_solo: bool) -> Tuple[dict[int, list[Game]], float]:
         if is_max_solo:
-            solo_games_number: int = min(len(self.player.solo_games), self.config["games_min_total"])
+            solo_games_number: int = min(self.player.games.solo_number, self.config["games_min_total"])
             per_solo: float = solo_games_number / self.config["games_min_total"]
             premade_games_number: int = self.config["games_min_total"] - solo_games_number
         else:
             per_solo: float = max(
-                len(self.player.solo_games) / (len(self.player.solo_games) + len(self.player.premade_games)),
+                self.player.games.solo_number / len(self.player.games),
                 self.config["games_min_solo"] / self.config["games_min_total"]
             )
             solo_games_number: int = round(per_solo * self.config["games_min_total"])
             premade_games_number: int = self.config["games_min_total"] - solo_games_number
-        games_list: List[Game] = self.player.solo_games[:solo_games_number] + self.player.premade_games[:premade_games_number]
+        games_list: List[Game] = self.player.games.most_recent(True, solo_games_number) + self.player.games.most_recent(False, premade_games_number)
         scaling_per_solo: float = self.config["scaling_per_solo_min"] + self.config["flat_per_solo_scaling"] * (3 * per_solo - 1)
         sorted_games: dict[int, list[Game]] = defaultdict(list)
         for game in games_list:
@@ -462,10 +579,10 @@ class Main:
         self.player.points_count = final_points_count
         self.player.point_count_recap = points_count_recap
 
-    def save_data(self, security_save: bool = False) -> None:
+    async def save_data(self, security_save: bool = False) -> None:
         old_premade_games_ids_to_verify: List[str] = [game.game_id for game in self.player.premade_games if not game.is_new and not game.is_solo]
-        self.database_manager.update_solo_games_to_premade_games(self.player.puuid, old_premade_games_ids_to_verify)
-        all_games: List[Game] = self.player.solo_games + self.player.premade_games
+        await self.database_manager.update_solo_games_to_premade_games(self.player.puuid, old_premade_games_ids_to_verify)
+        all_games: List[Game] = list(self.player.games)
         new_games_to_save: dict[str, dict[str, str|bool|float]] = {
             game.game_id: {
                 "game_date": game.game_date,
@@ -477,23 +594,45 @@ class Main:
             }
             for game in all_games if game.is_new
         }
-        self.database_manager.add_new_games(self.player.puuid, new_games_to_save)
+        await self.database_manager.add_new_games(self.player.puuid, new_games_to_save)
         print("Games sauvegardées.")
         if not security_save:
-            self.database_manager.update_player(self.player.puuid, self.player.points_count, self.player.point_count_recap)
+            await self.database_manager.update_player(
+                self.player.puuid, self.player.points_count, self.player.point_count_recap, self.player.last_match_id, self.config_hash
+            )
             print("Joueur sauvegardé.")
         self.player.clear_games()
-        self.write_current_player_duration("", 0)
+        await self.write_current_player_duration("", 0)
         del self.player
 
+    async def get_last_match_id(self, player_db: Row) -> Optional[str]:
+        corpus: Optional[TrafficCorpus] = self.api_manager.corpus
+        if corpus is not None and corpus.is_replay: # Corpus antérieurs à la sonde : traitement complet, comme lors de leur capture.
+            return corpus.replay("probe:last_match_id") if "probe:last_match_id" in corpus.responses else None
+        scheduler: QueueScheduler = self.schedulers.get(player_db.platform) or QueueScheduler(self.api_manager, self.config)
+        last_match_id: Optional[str] = await scheduler.get_last_match_id(player_db) # Sonde de l'estimation reprise si récente.
+        if corpus is not None: # La sonde reprise a été faite avant le début de la capture.
+            corpus.record("probe:last_match_id", last_match_id)
+        return last_match_id
+
     async def algo(self, player_db: Row) -> None:
-        self.create_player(player_db)
+        last_match_id: Optional[str] = await self.get_last_match_id(player_db)
+        if (
+            player_db.points_count >= 0.5 and player_db.config_hash == self.config_hash
+            and last_match_id is not None and last_match_id == player_db.last_match_id
+        ): # Aucune nouvelle game dans la fenêtre depuis le dernier traitement réussi avec la même config : score conservé, sans relire les games.
+            await self.database_manager.update_player(
+                player_db.riot_puuid, player_db.points_count, player_db.points_count_recap, last_match_id, self.config_hash
+            )
+            print(f"Joueur {player_db.riot_puuid} inchangé depuis le dernier traitement.")
+            return
+        await self.create_player(player_db)
+        self.player.last_match_id = last_match_id
         print(f"Joueur en cours : {self.player.puuid}")
         solo_games_to_verify: List[Game] = await self.games_update()
         await self.ensure_minimum_games(solo_games_to_verify)
-        print(f"\rNombre de games traitées : {len(self.player.solo_games) + len(self.player.premade_games)} ", end="")
+        print(f"\rNombre de games traitées : {len(self.player.games)} ", end="")
         self.clean_up_excess_games()
-        self.player.sort_games_by_timestamp()
         for game in solo_games_to_verify:
             game.remove_players()
         del solo_games_to_verify
@@ -502,19 +641,43 @@ class Main:
         if verification_min["solo"] and verification_min["total"]:
             self.points_count_calculation()
         else:
-            solo_games_number = min(len(self.player.solo_games), self.config["games_min_solo"])
-            total_games_number = min(solo_games_number + len(self.player.premade_games), self.config["games_min_total"])
+            solo_games_number = min(self.player.games.solo_number, self.config["games_min_solo"])
+            total_games_number = min(solo_games_number + self.player.games.premade_number, self.config["games_min_total"])
             print(f"""Manque de games : {solo_games_number}/{self.config["games_min_solo"]} games solo ; {total_games_number}/{self.config["games_min_total"]} games totales.""")
-        self.save_data()
+        await self.save_data()
 
     async def run(self) -> None:
-        players_in_queue: List[Row] = self.database_manager.get_players_in_queue()
-        for player_db in players_in_queue:
+        players_in_queue: List[Row] = await self.database_manager.get_players_in_queue()
+        await self.database_manager.mark_players_pending([player_db.riot_puuid for player_db in players_in_queue])
+        platforms: set[str] = {player_db.platform for player_db in players_in_queue}
+        workers = [copy.copy(self).run_platform(platform) for platform in platforms] # Un joueur en cours par plateforme.
+        if self.corpus_mode == CAPTURE: # Un seul corpus enregistré à la fois.
+            for worker in workers:
+                await worker
+        else:
+            await asyncio.gather(*workers)
+
+    async def run_platform(self, platform: str) -> None:
+        if platform not in self.schedulers:
+            self.schedulers[platform] = QueueScheduler(self.api_manager, self.config)
+        scheduler: QueueScheduler = self.schedulers[platform]
+        processed_puuids: set[str] = set() # Un seul passage par joueur et par run, même en cas d'échec.
+        while True:
+            players_in_queue: List[Row] = [ # File relue à chaque joueur : les nouveaux inscrits courts passent devant.
+                player_db for player_db in await self.database_manager.get_players_in_queue()
+                if player_db.platform == platform and player_db.riot_puuid not in processed_puuids
+            ]
+            player_db: Optional[Row] = await scheduler.next_player(players_in_queue)
+            if player_db is None:
+                break
+            processed_puuids.add(player_db.riot_puuid)
+            self.start_capture(player_db)
             try:
                 await self.algo(player_db)
             except RequestError as r:
                 print(f"\nErreur sur une requête détectée : {r}")
-                self.save_data(security_save = True)
+                if hasattr(self, "player"): # Sonde de la dernière game en échec avant la création du joueur : rien à sauvegarder.
+                    await self.save_data(security_save = True)
                 break
             except Exception as e:
                 print(f"\nErreur sur le compte {player_db.riot_puuid} : {e}")
@@ -522,9 +685,12 @@ class Main:
                     self.player.clear_games()
                     del self.player
                 continue
+            finally:
+                self.stop_capture()
             await asyncio.sleep(15) # Uniquement si utilisation de l'op.gg scrapper.
 
 async def main_loop(main: Main) -> None:
+    await main.start()
     while True:
         await main.run()
         await asyncio.sleep(150) # 2 minutes 30 de pause.
@@ -1,10 +1,76 @@
 import os
+import time
+import bisect
 import asyncio
 import aiohttp
-from typing import Dict, List, Any, Optional
+from urllib.parse import urlsplit
+from typing import Dict, List, Tuple, Any, Optional
 from utils import RequestError
+from traffic_corpus import TrafficCorpus
 import random
 
+DEFAULT_PLATFORM: str = "euw1"
+REGIONAL_ROUTES: Dict[str, str] = { # Routage match-v5 par plateforme.
+    "euw1": "europe", "eun1": "europe", "tr1": "europe", "ru": "europe", "me1": "europe",
+    "na1": "americas", "br1": "americas", "la1": "americas", "la2": "americas",
+    "kr": "asia", "jp1": "asia",
+    "oc1": "sea", "ph2": "sea", "sg2": "sea", "th2": "sea", "tw2": "sea", "vn2": "sea"
+}
+ACCOUNT_ROUTES: Dict[str, str] = {"europe": "europe", "americas": "americas", "asia": "asia", "sea": "asia"} # account-v1 n'existe pas sur sea.
+def parse_rate_limits(rate_limits: str) -> List[Tuple[int, float]]: # Format des en-têtes X-App-Rate-Limit : "20:1,100:120".
+    return [(int(max_requests), float(period)) for max_requests, period in (rate_limit.split(":") for rate_limit in rate_limits.split(","))]
+
+RATE_LIMITS: List[Tuple[int, float]] = parse_rate_limits( # (requêtes, secondes) par route avant la première réponse, ensuite celles annoncées par l'API.
+    os.environ.get("RIOT_RATE_LIMITS", "20:1,100:120")
+)
+MAX_CONCURRENCY: int = 10 # Requêtes simultanées par route.
+WARM_UP_TIMEOUT: float = 3 # Secondes maximum pour ouvrir une connexion de préchauffage.
+
+class RateLimiter:
+    """Limiteur d'une route : fenêtres glissantes sur le nombre de requêtes et nombre maximum de requêtes simultanées."""
+
+    def __init__(self, rate_limits: List[Tuple[int, float]], max_concurrency: int) -> None:
+        self._rate_limits: List[Tuple[int, float]] = rate_limits
+        self._longest_period: float = max(period for _, period in rate_limits)
+        self._timestamps: List[float] = [] # Dates des requêtes envoyées, de la plus ancienne à la plus récente.
+        self._paused_until: float = 0.0 # Retry-After reçu sur la route.
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    def set_rate_limits(self, rate_limits: List[Tuple[int, float]]) -> None:
+        if rate_limits != self._rate_limits:
+            self._rate_limits = rate_limits
+            self._longest_period = max(period for _, period in rate_limits)
+
+    def pause(self, duration: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + duration)
+
+    def _get_waiting_time(self, now: float) -> float:
+        stale: int = bisect.bisect_right(self._timestamps, now - self._longest_period)
+        if stale:
+            del self._timestamps[:stale]
+        waiting_time: float = max(0.0, self._paused_until - now)
+        for max_requests, period in self._rate_limits:
+            if len(self._timestamps) - bisect.bisect_right(self._timestamps, now - period) >= max_requests:
+                waiting_time = max(waiting_time, self._timestamps[-max_requests] + period - now)
+        return waiting_time
+
+    async def __aenter__(self) -> None:
+        await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                waiting_time: float = self._get_waiting_time(time.monotonic())
+                while waiting_time > 0:
+                    await asyncio.sleep(waiting_time)
+                    waiting_time = self._get_waiting_time(time.monotonic())
+                self._timestamps.append(time.monotonic())
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._semaphore.release()
+
 class APIManager:
     """
     Classe pour effectuer les requêtes à l'API de Riot Games.
@@ -12,9 +78,13 @@ class APIManager:
     L'écologie, c'est important.
     """
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(self, api_key: str, rate_limits: List[Tuple[int, float]] = RATE_LIMITS, max_concurrency: int = MAX_CONCURRENCY) -> None:
         self._key: str = api_key
+        self._rate_limits: List[Tuple[int, float]] = rate_limits
+        self._max_concurrency: int = max_concurrency
+        self._limiters: Dict[str, RateLimiter] = {} # Un limiteur par route (hôte), les plateformes ne partagent pas leur budget.
         self.session: Optional[aiohttp.ClientSession] = None
+        self.corpus: Optional[TrafficCorpus] = None # Enregistrement ou rejeu des réponses, voir traffic_corpus.py.
 
     async def _arequests(self, url: str, timeout: float = random.uniform(2.5, 5), max_retries: int = 5) -> Any:
         """
@@ -28,29 +98,41 @@ class APIManager:
         Returns:
             La réponse JSON de la requête.
         """
+        if self.corpus is not None and self.corpus.is_replay:
+            return self.corpus.replay(url)
         if self.session is None:
-            self.session = aiohttp.ClientSession()
+            self.session = self._create_session()
         headers: Dict[str, str] = {"X-Riot-Token": self._key}
+        limiter: RateLimiter = self.get_limiter(urlsplit(url).netloc)
         for attempt in range(max_retries):
             try:
-                async with self.session.get(url, headers = headers) as response:
+                async with limiter, self.session.get(url, headers = headers) as response:
+                    app_rate_limit: Optional[str] = response.headers.get("X-App-Rate-Limit")
+                    if app_rate_limit: # Limites réelles de la clé (développement ou production) sur cette route.
+                        limiter.set_rate_limits(parse_rate_limits(app_rate_limit))
                     match response.status:
                         case 200:
-                            return await response.json()
+                            return self._record(url, await response.json())
                         case 400:
-                            return []
+                            return self._record(url, [])
                         case 404:
-                            return None
+                            return self._record(url, None)
                         case 429:
-                            await asyncio.sleep(timeout)
-                            timeout *= 2
+                            retry_after: Optional[str] = response.headers.get("Retry-After")
+                            if retry_after is not None: # Attente imposée par l'API, appliquée à toutes les requêtes de la route.
+                                limiter.pause(float(retry_after))
+                            else:
+                                await asyncio.sleep(timeout)
+                                timeout *= 2
                         case _:
                             await asyncio.sleep(timeout)
                             timeout *= 2
+            except asyncio.CancelledError: # Tâche sœur en échec : la réponse est fermée par la sortie du bloc, pas de nouvelle tentative.
+                raise
             except ConnectionResetError:
                 if self.session is not None and not self.session.closed:
                     await self.session.close()
-                self.session = aiohttp.ClientSession()
+                self.session = self._create_session()
                 await asyncio.sleep(timeout)
                 timeout *= 2
             except:
@@ -58,39 +140,84 @@ class APIManager:
                 timeout *= 2
         raise RequestError(f"Erreur HTTP après {max_retries} tentatives.", url = url, status_code = response.status)
 
+    @staticmethod
+    def _create_session() -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(connector = aiohttp.TCPConnector(ttl_dns_cache = 300, keepalive_timeout = 60))
+
+    async def warm_up(self, platforms: List[str]) -> None:
+        """
+        Ouvre la session HTTP et une connexion TLS vers chaque route des plateformes avant la première requête.
+        Les requêtes de préchauffage n'ont pas de clé API et ne consomment donc pas de rate limit, un échec est ignoré.
+        """
+        if self.session is None:
+            self.session = self._create_session()
+        routes: set[str] = set()
+        for platform in platforms:
+            routes.update({platform, self.get_regional_route(platform), self.get_account_route(platform)})
+        async def open_connection(route: str) -> None:
+            try:
+                async with self.session.head(f"https://{route}.api.riotgames.com/", timeout = aiohttp.ClientTimeout(total = WARM_UP_TIMEOUT)):
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+        await asyncio.gather(*(open_connection(route) for route in routes))
+
+    def get_limiter(self, route: str, rate_limits: Optional[List[Tuple[int, float]]] = None) -> RateLimiter:
+        if route not in self._limiters: # Limites propres à la route si fournies (op.gg), sinon celles de l'API Riot Games.
+            self._limiters[route] = RateLimiter(rate_limits or self._rate_limits, self._max_concurrency)
+        return self._limiters[route]
+
+    @staticmethod
+    def get_regional_route(platform: str) -> str:
+        return REGIONAL_ROUTES[platform]
+
+    @staticmethod
+    def get_account_route(platform: str) -> str:
+        return ACCOUNT_ROUTES[REGIONAL_ROUTES[platform]]
+
+    def _record(self, url: str, response: Any) -> Any:
+        if self.corpus is not None:
+            self.corpus.record(url, response)
+        return response
+
     """
     Les méthodes suivantes sont des wrappers pour différents endpoints.
-    Chaque méthode a ses propres arguments.
+    Chaque méthode a ses propres arguments, la plateforme (euw1, eun1, na1...) détermine les hôtes utilisés.
     """
 
-    async def get_tag_from_puuid(self, puuid: str) -> Any:
+    async def get_tag_from_puuid(self, puuid: str, platform: str = DEFAULT_PLATFORM) -> Any:
         """
         Get player riot tag from puuid.
 
         Args:
             puuid: puuid of the player.
+            platform: platform of the player.
         """
-        url = f"https://europe.api.riotgames.com/riot/account/v1/accounts/by-puuid/{puuid}"
+        url = f"https://{self.get_account_route(platform)}.api.riotgames.com/riot/account/v1/accounts/by-puuid/{puuid}"
         return await self._arequests(url)
 
-    async def get_profile_from_puuid(self, puuid: str) -> Any:
+    async def get_profile_from_puuid(self, puuid: str, platform: str = DEFAULT_PLATFORM) -> Any:
         """
         Profil d'un joueur selon son puuid.
 
         Args:
             puuid: puuid du joueur.
+            platform: Plateforme du joueur.
         """
-        url = f"https://euw1.api.riotgames.com/lol/summoner/v4/summoners/by-puuid/{puuid}"
+        url = f"https://{platform}.api.riotgames.com/lol/summoner/v4/summoners/by-puuid/{puuid}"
         return await self._arequests(url)
     
-    async def get_elo(self, summoner_id: str) -> Any:
+    async def get_elo(self, summoner_id: str, platform: str = DEFAULT_PLATFORM) -> Any:
         """
         Informations sur le classement d'un joueur selon son id.
 
         Args:
             id: id du joueur.
+            platform: Plateforme du joueur.
         """
-        url = f"https://euw1.api.riotgames.com/lol/league/v4/entries/by-summoner/{summoner_id}"
+        url = f"https://{platform}.api.riotgames.com/lol/league/v4/entries/by-summoner/{summoner_id}"
         return await self._arequests(url)
     
     async def get_matches_list(
@@ -100,7 +227,8 @@ class APIManager:
         end_time: Optional[str | int] = None,
         queue: Optional[str | int] = None,
         index_start: Optional[str | int] = None,
-        count: Optional[str | int] = None
+        count: Optional[str | int] = None,
+        platform: str = DEFAULT_PLATFORM
     ) -> Any:
         """
         Liste de matchs pour un joueur à partir de son puuid.
@@ -112,8 +240,9 @@ class APIManager:
             queue: File considérée pour la requête.
             index_start: Numéro de la game à considérer depuis la dernière.
             count: Nombre de games à récupérer. (max 100)
+            platform: Plateforme du joueur.
         """
-        url: str = f"https://europe.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?"
+        url: str = f"https://{self.get_regional_route(platform)}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?"
         if update_time:
             url += f"startTime={update_time}&"
         if end_time:
@@ -126,12 +255,39 @@ class APIManager:
             url = url[:-1]
         return await self._arequests(url)
     
-    async def get_game_data(self, gameid: str) -> Any:
+    async def get_game_data(self, gameid: str, platform: str = DEFAULT_PLATFORM) -> Any:
         """
         Informations d'une game à partir de son id.
 
         Args:
             gameid: id de la game.
+            platform: Plateforme de la game.
         """
-        url = f"https://europe.api.riotgames.com/lol/match/v5/matches/{gameid}"
-        return await self._arequests(url)
\ No newline at end of file
+        url = f"https://{self.get_regional_route(platform)}.api.riotgames.com/lol/match/v5/matches/{gameid}"
+        return await self._arequests(url)
+    
+    async def get_league_entries(self, tier: str, division: str, page: int = 1, queue: str = "RANKED_SOLO_5x5", platform: str = DEFAULT_PLATFORM) -> Any:
+        """
+        Page du classement d'une division (league-exp-v4), jusqu'à 205 entrées par page.
+
+        Args:
+            tier: Tier de la division (IRON à CHALLENGER).
+            division: Division (I à IV).
+            page: Numéro de la page, à partir de 1.
+            queue: File classée.
+            platform: Plateforme du classement.
+        """
+        url = f"https://{platform}.api.riotgames.com/lol/league-exp/v4/entries/{queue}/{tier}/{division}?page={page}"
+        return await self._arequests(url)
+    
+    async def get_apex_league(self, tier: str, queue: str = "RANKED_SOLO_5x5", platform: str = DEFAULT_PLATFORM) -> Any:
+        """
+        Ligue complète d'un tier Master+ (league-v4) en une seule requête.
+
+        Args:
+            tier: MASTER, GRANDMASTER ou CHALLENGER.
+            queue: File classée.
+            platform: Plateforme du classement.
+        """
+        url = f"https://{platform}.api.riotgames.com/lol/league/v4/{tier.lower()}leagues/by-queue/{queue}"
+        return await self._arequests(url)
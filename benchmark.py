@@ -0,0 +1,358 @@
+"""
+Microbenchmarks des parties CPU de l'algo sur des données synthétiques (aucun accès réseau ni base de données).
+Les résultats sont écrits en JSON puis comparés à une baseline enregistrée pour détecter les régressions avant un tournoi.
+
+Usage :
+    python benchmark.py                       # Mesure et comparaison à benchmark_baseline.json
+    python benchmark.py --save-baseline       # Mesure et remplacement de la baseline
+    python benchmark.py --sizes 50 500        # Tailles de joueurs (nombre de games)
+"""
+import os
+import io
+import sys
+import json
+import time
+import math
+import uuid
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import contextlib
+import statistics
+import subprocess
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, insert
+import algo
+from algo import Game, Player, Main
+from api_manager import APIManager
+from database_manager import METADATA, PLAYERS_TABLE
+from utils import no_pacing
+
+SIZES: List[int] = [50, 500, 5000]
+TOLERANCE: float = 0.25 # Ralentissement maximum accepté par rapport à la baseline.
+MIN_DELTA_S: float = 0.002 # En dessous de cet écart absolu, la différence est considérée comme du bruit.
+BASELINE_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+OUTPUT_PATH: str = "benchmark_results.json"
+FIRST_TIMESTAMP: int = 1_704_067_200 # 01/01/2024.
+QUEUES: List[int] = [420, 420, 420, 440, 400, 430, 490]
+TIERS: List[str] = ["IRON", "BRONZE", "SILVER", "GOLD", "PLATINUM", "EMERALD", "DIAMOND", "MASTER", "GRANDMASTER", "CHALLENGER"]
+RANKS: List[str] = ["IV", "III", "II", "I"]
+
+BENCHMARK_CONFIG: Dict[str, int|float] = {
+    "max_date": FIRST_TIMESTAMP + 3600 * 5000,
+    "min_date": FIRST_TIMESTAMP,
+    "games_min_solo": 20,
+    "games_min_total": 50,
+    "games_max_total": 80,
+    "scaling_per_solo_min": 1.2,
+    "flat_per_solo_scaling": 0.4,
+    "scaling_pond_max": 0.3,
+    "seuil_pond_max": 0.25,
+    "power_delta_winrate": 1.5,
+    "scaling_winrate": 1.0,
+    "scaling_tier_power": 0.05,
+    "scaling_distier_min": 1.0,
+    "flat_distier_scaling": 0.5,
+    "scaling_distier_dir": 0.3,
+    "power_distier_min": 1.0,
+    "flat_distier_power": 0.5,
+    "games_min_tier": 2,
+    "scaling_log": 1.0,
+    "flat_log": 1.0,
+    "power_log": 1.0
+}
+
+STARTUP_PROBE: str = """
+import os, sys, json, time, asyncio
+marks = {}
+import algo
+from api_manager import APIManager
+marks["import"] = time.time()
+async def first_request(self, url, *args, **kwargs):
+    marks["first_request"] = time.time()
+    print(json.dumps(marks), flush = True)
+    os._exit(0)
+async def no_warm_up(self, platforms):
+    pass
+APIManager._arequests = first_request
+APIManager.warm_up = no_warm_up
+async def run():
+    main = algo.Main(**json.loads(sys.argv[1]))
+    marks["init"] = time.time()
+    await main.start()
+    marks["warm_up"] = time.time()
+    await main.run()
+asyncio.run(run())
+""" # Worker lancé dans un nouveau processus jusqu'à sa première requête API (sonde du scheduler), sans préchauffage réseau.
+
+"""
+Générateurs de données synthétiques.
+Les formats reprennent ceux de l'API Riot Games (match-v5, account-v1) et des lignes renvoyées par DatabaseManager.
+"""
+
+def generate_puuid(rng: random.Random) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789-_") for _ in range(78))
+
+def generate_rank(rng: random.Random) -> Dict[str, Any]:
+    return {"queueType": "RANKED_SOLO_5x5", "tier": rng.choice(TIERS), "rank": rng.choice(RANKS), "leaguePoints": rng.randrange(0, 100)}
+
+class SyntheticPlayer:
+    """Historique synthétique d'un joueur : games au format match-v5 et pool de coéquipiers récurrents pour les premades."""
+
+    def __init__(self, games_number: int, seed: int = 0) -> None:
+        self.rng: random.Random = random.Random(seed)
+        self.puuid: str = generate_puuid(self.rng)
+        self.friends: List[str] = [generate_puuid(self.rng) for _ in range(8)]
+        self.strangers: List[str] = [generate_puuid(self.rng) for _ in range(max(50, games_number * 4))]
+        self.games: Dict[str, Any] = {}
+        for index in range(games_number):
+            game_id: str = f"EUW1_{7_000_000_000 + index}"
+            self.games[game_id] = self.generate_game_data(game_id, FIRST_TIMESTAMP + 3600 * index)
+
+    def generate_game_data(self, game_id: str, timestamp: int) -> Any:
+        friends_number: int = self.rng.choice([0, 0, 0, 1, 2])
+        teammates: List[str] = self.rng.sample(self.friends, friends_number) + self.rng.sample(self.strangers, 4 - friends_number)
+        enemies: List[str] = self.rng.sample(self.strangers, 5)
+        participants: List[str] = [self.puuid] + teammates + enemies
+        is_win: bool = self.rng.random() < 0.5
+        return {
+            "metadata": {"matchId": game_id, "participants": participants},
+            "info": {
+                "gameCreation": timestamp * 1000,
+                "queueId": self.rng.choice(QUEUES),
+                "participants": [{"puuid": participant, "win": is_win if index < 5 else not is_win} for index, participant in enumerate(participants)]
+            }
+        }
+
+    def previous_games_rows(self) -> List[SimpleNamespace]:
+        """Lignes équivalentes à DatabaseManager.get_previous_games, des plus récentes aux plus anciennes."""
+        rows: List[SimpleNamespace] = []
+        for game_id, game_data in self.games.items():
+            is_soloq: bool = game_data["info"]["queueId"] == 420
+            is_win: bool = game_data["info"]["participants"][0]["win"]
+            points_count: int = self.rng.randrange(1, 16)
+            rows.append(SimpleNamespace(
+                riot_game_id = game_id,
+                game_date = str(game_data["info"]["gameCreation"] // 1000),
+                is_soloq = is_soloq,
+                win_points_count = points_count if is_win else None,
+                lose_points_count = None if is_win else points_count,
+                is_solo = is_soloq or self.rng.random() < 0.5,
+                is_win = is_win
+            ))
+        rows.sort(key = lambda row: int(row.game_date), reverse = True)
+        return rows
+
+class FakeAPIManager(APIManager):
+    """APIManager en mémoire : mêmes wrappers d'endpoints, réponses servies depuis un SyntheticPlayer."""
+
+    def __init__(self, synthetic_player: SyntheticPlayer) -> None:
+        super().__init__("benchmark")
+        self.synthetic_player: SyntheticPlayer = synthetic_player
+        self.requests_count: int = 0
+
+    async def _arequests(self, url: str, *args: Any, **kwargs: Any) -> Any:
+        self.requests_count += 1
+        await asyncio.sleep(0) # Point de suspension équivalent à une requête réelle.
+        path, _, query = url.partition("?")
+        if path.endswith("/ids"):
+            parameters: Dict[str, str] = dict(parameter.split("=") for parameter in query.split("&") if parameter)
+            start_time: int = int(parameters.get("startTime", 0))
+            end_time: int = int(parameters.get("endTime", 10 ** 12))
+            games_ids: List[str] = [
+                game_id for game_id, game_data in reversed(self.synthetic_player.games.items())
+                if start_time <= game_data["info"]["gameCreation"] // 1000 <= end_time
+            ]
+            index_start: int = int(parameters.get("start", 0))
+            return games_ids[index_start:index_start + int(parameters.get("count", 20))]
+        if "/matches/" in path:
+            return self.synthetic_player.games.get(path.rsplit("/", 1)[1])
+        if "/accounts/by-puuid/" in path:
+            puuid: str = path.rsplit("/", 1)[1]
+            return {"puuid": puuid, "gameName": puuid[:16], "tagLine": "EUW"}
+        return None
+
+async def fake_get_previous_rank(session: Any, name: str, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+    await asyncio.sleep(0)
+    return generate_rank(random.Random(name))
+
+@contextlib.contextmanager
+def offline() -> Any:
+    """Supprime les temporisations entre requêtes, le scrapper op.gg et les affichages de progression pendant une mesure."""
+    original_get_previous_rank: Callable = algo.get_previous_rank
+    algo.get_previous_rank = fake_get_previous_rank
+    try:
+        with no_pacing(), contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        algo.get_previous_rank = original_get_previous_rank
+
+"""
+Construction des objets mesurés.
+"""
+
+def build_player(synthetic_player: SyntheticPlayer, api_manager: Optional[APIManager] = None) -> Player:
+    player: Player = Player(api_manager or FakeAPIManager(synthetic_player), synthetic_player.puuid, 10.0)
+    player.add_previous_games(synthetic_player.previous_games_rows())
+    return player
+
+def build_main(player: Player) -> Main:
+    main: Main = Main.__new__(Main) # Sans base de données ni clé API.
+    main.config = dict(BENCHMARK_CONFIG)
+    main.api_manager = player.api_manager
+    main.player = player
+    return main
+
+def build_premade_checking_case(synthetic_player: SyntheticPlayer) -> tuple[Player, List[Game]]:
+    player: Player = build_player(synthetic_player)
+    solo_games_to_verify: List[Game] = []
+    for game in player.solo_games:
+        if not game.is_soloq:
+            game.players = [participant for participant in synthetic_player.games[game.game_id]["metadata"]["participants"] if participant != player.puuid]
+            solo_games_to_verify.append(game)
+    async def update_premades() -> None:
+        for game_data in synthetic_player.games.values():
+            for participant in game_data["metadata"]["participants"]:
+                if participant != player.puuid:
+                    await player.update_premades(participant)
+    asyncio.run(update_premades())
+    return player, solo_games_to_verify
+
+"""
+Mesures.
+"""
+
+def measure(run: Callable[[Any], Any], setup: Callable[[], Any] = lambda: None, repeat: int = 5) -> Dict[str, float]:
+    timings: List[float] = []
+    for _ in range(repeat):
+        state: Any = setup()
+        start: float = time.perf_counter()
+        run(state)
+        timings.append(time.perf_counter() - start)
+    return {"min_s": min(timings), "median_s": statistics.median(timings), "repeat": repeat}
+
+def benchmark_size(games_number: int) -> Dict[str, Dict[str, float]]:
+    synthetic_player: SyntheticPlayer = SyntheticPlayer(games_number, seed = games_number)
+    repeat: int = 9 if games_number <= 500 else 3
+    results: Dict[str, Dict[str, float]] = {}
+
+    results["Player.premade_checking"] = measure(
+        lambda case: case[0].premade_checking(case[1]),
+        setup = lambda: build_premade_checking_case(synthetic_player), repeat = repeat
+    )
+    results["Main.clean_up_excess_games"] = measure(
+        lambda main: main.clean_up_excess_games(),
+        setup = lambda: build_main(build_player(synthetic_player)), repeat = repeat
+    )
+    main: Main = build_main(build_player(synthetic_player))
+    results["Main.initialize_points_count"] = measure(
+        lambda _: (main.initialize_points_count(is_max_solo = True), main.initialize_points_count(is_max_solo = False)), repeat = repeat
+    )
+    results["Main.points_count_calculation"] = measure(lambda _: main.points_count_calculation(), repeat = repeat)
+
+    games_data: List[Any] = list(synthetic_player.games.values())
+    async def analyze_all_games(player: Player) -> None:
+        for game_data in games_data:
+            await player.analyze_game_data(game_data)
+    results["Player.analyze_game_data"] = measure(
+        lambda player: asyncio.run(analyze_all_games(player)),
+        setup = lambda: Player(FakeAPIManager(synthetic_player), synthetic_player.puuid, 10.0), repeat = repeat
+    )
+
+    ranks: List[Dict[str, Any]] = [generate_rank(synthetic_player.rng) for _ in range(games_number * 5)]
+    game: Game = Game(None, "EUW1_0", True)
+    results["Game.get_participant_value"] = measure(lambda _: [game.get_participant_value(rank) for rank in ranks], repeat = repeat)
+
+    games_ids_list: List[str] = list(synthetic_player.games.keys())
+    def run_add_new_games(player: Player) -> None:
+        with offline():
+            asyncio.run(player.add_new_games(games_ids_list))
+    results["Player.add_new_games"] = measure(
+        run_add_new_games,
+        setup = lambda: Player(FakeAPIManager(synthetic_player), synthetic_player.puuid, 0.0), repeat = 1 if games_number > 500 else repeat
+    )
+    return {f"{name}[{games_number}]": result for name, result in results.items()}
+
+def benchmark_startup(repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """Temps entre le lancement d'un worker et sa première requête, sur une base SQLite contenant un joueur en file d'attente."""
+    phases: Dict[str, List[float]] = {"import": [], "init": [], "warm_up": [], "first_request": []}
+    with tempfile.TemporaryDirectory() as directory:
+        database_path: str = f"sqlite:///{os.path.join(directory, 'startup.sqlite')}"
+        engine = create_engine(database_path)
+        METADATA.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(insert(PLAYERS_TABLE).values(id = str(uuid.uuid4()), riot_puuid = "startup", is_queued = True, platform = "euw1", points_count = 0.0))
+        engine.dispose()
+        environment: Dict[str, str] = dict(os.environ, DB_2R2T_PATH = database_path, RIOT_API_KEY = "benchmark")
+        for _ in range(repeat):
+            started_at: float = time.time()
+            output: str = subprocess.run(
+                [sys.executable, "-c", STARTUP_PROBE, json.dumps(BENCHMARK_CONFIG)],
+                capture_output = True, text = True, env = environment, cwd = os.path.dirname(os.path.abspath(__file__)), check = True
+            ).stdout
+            marks: Dict[str, float] = json.loads(output.strip().splitlines()[-1])
+            for phase in phases:
+                phases[phase].append(marks[phase] - started_at)
+    names: Dict[str, str] = {
+        "import": "Startup.import_algo", "init": "Startup.main_init", "warm_up": "Startup.warm_up", "first_request": "Startup.time_to_first_request"
+    }
+    return {names[phase]: {"min_s": min(timings), "median_s": statistics.median(timings), "repeat": repeat} for phase, timings in phases.items()}
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Comparaison sur le temps minimum : le moins sensible aux perturbations extérieures (autres processus, ramasse-miettes)."""
+    regressions: List[str] = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<45} {result['min_s'] * 1000:>10.2f} ms   (absent de la baseline)")
+            continue
+        ratio: float = result["min_s"] / baseline[name]["min_s"] if baseline[name]["min_s"] > 0 else math.inf
+        is_regression: bool = ratio > 1 + tolerance and result["min_s"] - baseline[name]["min_s"] > MIN_DELTA_S
+        print(f"{name:<45} {result['min_s'] * 1000:>10.2f} ms   x{ratio:.2f}{'   REGRESSION' if is_regression else ''}")
+        if is_regression:
+            regressions.append(name)
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description = "Microbenchmarks des parties CPU de l'algo.")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = SIZES, help = "Nombre de games des joueurs synthétiques.")
+    parser.add_argument("--output", default = OUTPUT_PATH, help = "Fichier JSON des résultats.")
+    parser.add_argument("--baseline", default = BASELINE_PATH, help = "Fichier JSON de la baseline.")
+    parser.add_argument("--tolerance", type = float, default = TOLERANCE, help = "Ralentissement relatif accepté avant de signaler une régression.")
+    parser.add_argument("--save-baseline", action = "store_true", help = "Remplace la baseline par les résultats de cette exécution.")
+    parser.add_argument("--skip-startup", action = "store_true", help = "Ne mesure pas le temps de démarrage d'un worker.")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+    for games_number in args.sizes:
+        results.update(benchmark_size(games_number))
+    if not args.skip_startup:
+        results.update(benchmark_startup())
+    report: Dict[str, Any] = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results
+    }
+    with open(args.output, "w", encoding = "utf-8") as file:
+        json.dump(report, file, indent = 2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding = "utf-8") as file:
+            json.dump(report, file, indent = 2)
+        print(f"Baseline enregistrée : {args.baseline}")
+        return 0
+    baseline: Dict[str, Dict[str, float]] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding = "utf-8") as file:
+            baseline = json.load(file)["results"]
+    regressions: List[str] = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} régression(s) au-delà de {args.tolerance:.0%}.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
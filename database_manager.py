@@ -1,34 +1,183 @@
-from sqlalchemy import MetaData, Table, select, insert, update, delete, and_, or_, not_
-from sqlalchemy.engine import Engine, Result, Row
-from typing import List, Optional
+from sqlalchemy import MetaData, Table, Column, String, Text, Boolean, Integer, Float, DateTime, case, inspect, select, insert, update, delete, func, and_, or_, not_, text
+from sqlalchemy.engine import Engine, Connection, Result, Row
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateColumn
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from traffic_corpus import TrafficCorpus
+from api_manager import REGIONAL_ROUTES
+import threading
+import asyncio
+import functools
 import uuid
 
+"""
+Tables déclarées (voir README) : évite la réflexion du schéma complet au démarrage.
+"""
+METADATA: MetaData = MetaData()
+
+LEADERBOARD_LOCK_NAME: str = "algo_leaderboard" # Verrou nommé MySQL partagé par tous les processus qui écrivent le classement.
+LEADERBOARD_LOCK_TIMEOUT: int = 60 # Secondes d'attente maximale du verrou avant abandon de la transaction.
+
+PLAYERS_TABLE: Table = Table(
+    "algo_players", METADATA,
+    Column("id", String(36), primary_key = True),
+    Column("riot_puuid", String(78)),
+    Column("is_queued", Boolean, default = True),
+    Column("platform", String(8), default = "euw1"),
+    Column("points_count", Float, default = 0.0),
+    Column("points_count_recap", Text),
+    Column("last_match_id", String(32), nullable = True), # Game la plus récente de la fenêtre lors du dernier traitement.
+    Column("config_hash", String(16), nullable = True), # Empreinte de la config utilisée pour ce traitement, voir utils.get_config_hash.
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime)
+)
+
+GAMES_TABLE: Table = Table(
+    "algo_games", METADATA,
+    Column("id", String(36), primary_key = True),
+    Column("riot_game_id", String(32)),
+    Column("game_date", String(16)),
+    Column("is_soloq", Boolean),
+    Column("win_points_count", Integer),
+    Column("lose_points_count", Integer)
+)
+
+JOINT_TABLE: Table = Table(
+    "algo_players_games", METADATA,
+    Column("id", String(36), primary_key = True),
+    Column("riot_game_id", String(32)),
+    Column("riot_puuid", String(78)),
+    Column("is_solo", Boolean),
+    Column("is_win", Boolean)
+)
+
+CURRENT_PLAYER_TABLE: Table = Table(
+    "algo_current_player", METADATA,
+    Column("id", String(36), primary_key = True),
+    Column("riot_ign", String(64)),
+    Column("platform", String(8), default = "euw1"), # Une ligne par plateforme, les plateformes sont traitées en parallèle.
+    Column("duration", Integer),
+    Column("updated_at", DateTime)
+)
+
+LEADERBOARD_TABLE: Table = Table( # Seule table créée par le script, voir DatabaseManager._initialize_leaderboard.
+    "algo_leaderboard", METADATA,
+    Column("id", String(36), primary_key = True),
+    Column("riot_puuid", String(78), nullable = False, unique = True),
+    Column("rank_position", Integer, nullable = True, index = True),
+    Column("points_count", Float(precision = 53), nullable = False, default = 0.0, index = True), # DOUBLE : égalités exactes avec les scores Python.
+    Column("status", String(16), nullable = False),
+    Column("missing_solo_games", Integer, nullable = True),
+    Column("missing_total_games", Integer, nullable = True),
+    Column("updated_at", DateTime, nullable = False)
+)
+
+def _ladder_table(name: str) -> Table:
+    return Table(
+        name, METADATA,
+        Column("riot_puuid", String(78), primary_key = True),
+        Column("platform", String(8), nullable = False, index = True),
+        Column("tier", String(16), nullable = False),
+        Column("rank", String(4), nullable = False),
+        Column("league_points", Integer, nullable = False),
+        Column("updated_at", DateTime, nullable = False, index = True)
+    )
+
+LADDER_TABLE: Table = _ladder_table("algo_ladder") # Classement solo/duo courant, rempli par ladder_snapshot.py.
+PREVIOUS_LADDER_TABLE: Table = _ladder_table("algo_ladder_previous") # Copie figée du classement de fin de la saison précédente.
+
+MIGRATED_COLUMNS: List[Tuple[Table, str]] = [ # Colonnes déclarées après la création des tables, ajoutées aux bases existantes par DatabaseManager._migrate.
+    (PLAYERS_TABLE, "platform"),
+    (PLAYERS_TABLE, "last_match_id"),
+    (PLAYERS_TABLE, "config_hash"),
+    (CURRENT_PLAYER_TABLE, "platform")
+]
+
 class DatabaseManager:
     """Gestionnaire des requêtes à la base de données."""
 
-    def __init__(self, engine: Engine) -> None:
+    def __init__(self, engine: Engine, games_min_solo: int, games_min_total: int) -> None:
         self._engine: Engine = engine
-        self._metadata: MetaData = MetaData()
-        self._metadata.reflect(bind = self._engine)
-        self._players_table: Table = self._metadata.tables["algo_players"]
-        self._games_table: Table = self._metadata.tables["algo_games"]
-        self._joint_table: Table = self._metadata.tables["algo_players_games"]
-        self._current_player_table: Table = self._metadata.tables["algo_current_player"]
+        self._games_min_solo: int = games_min_solo
+        self._games_min_total: int = games_min_total
+        self._players_table: Table = PLAYERS_TABLE
+        self._games_table: Table = GAMES_TABLE
+        self._joint_table: Table = JOINT_TABLE
+        self._current_player_table: Table = CURRENT_PLAYER_TABLE
+        self._leaderboard_table: Table = LEADERBOARD_TABLE
+        self._ladder_table: Table = LADDER_TABLE
+        self._previous_ladder_table: Table = PREVIOUS_LADDER_TABLE
+        self._leaderboard_lock: threading.Lock = threading.Lock() # Les décalages de rangs doivent être sérialisés, voir _leaderboard_transaction.
+        self._invalid_platform_puuids: set[str] = set() # Joueurs déjà signalés, voir get_players_in_queue.
+        self._migrate()
         self._initialize_current_player()
+        self._initialize_leaderboard()
+        METADATA.create_all(self._engine, tables = [self._ladder_table, self._previous_ladder_table]) # Tables vides si le snapshot n'a jamais été lancé.
 
-    def _execute_edit(self, query_list) -> None:
+    @contextmanager
+    def _transaction(self) -> Iterator[Connection]:
         with self._engine.connect() as connection:
             transaction = connection.begin()
             try:
-                for query in query_list:
-                    connection.execute(query)
+                yield connection
                 transaction.commit() # Valider la transaction
             except Exception as e:
                 transaction.rollback() # Annuler en cas d'erreur
                 print(f"Erreur lors de l'exécution des requêtes : {e}")
                 raise
 
+    @contextmanager
+    def _named_lock(self, name: str) -> Iterator[None]:
+        """Verrou consultatif MySQL (GET_LOCK) tenu sur une connexion dédiée, sans effet sur les autres bases (SQLite sérialise déjà les écritures)."""
+        if self._engine.dialect.name != "mysql":
+            yield
+            return
+        with self._engine.connect() as connection:
+            if connection.execute(text("SELECT GET_LOCK(:name, :timeout)"), {"name": name, "timeout": LEADERBOARD_LOCK_TIMEOUT}).scalar() != 1:
+                raise RuntimeError(f"Verrou {name} non obtenu après {LEADERBOARD_LOCK_TIMEOUT} secondes.")
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+
+    @contextmanager
+    def _leaderboard_transaction(self) -> Iterator[Connection]:
+        """
+        Transaction de mise à jour du classement : les décalages de rangs relisent puis modifient des lignes partagées entre joueurs.
+        Sérialisée entre threads par _leaderboard_lock et entre processus (plusieurs workers sur la même base) par un verrou nommé MySQL.
+        """
+        with self._leaderboard_lock, self._named_lock(LEADERBOARD_LOCK_NAME), self._transaction() as connection:
+            yield connection
+
+    def _execute_edit(self, query_list) -> None:
+        with self._transaction() as connection:
+            for query in query_list:
+                connection.execute(query)
+
+    def _migrate(self) -> None:
+        """Ajoute les colonnes de MIGRATED_COLUMNS absentes des tables existantes, les lignes déjà présentes reçoivent la valeur par défaut."""
+        inspector = inspect(self._engine)
+        for table, column_name in MIGRATED_COLUMNS:
+            if not inspector.has_table(table.name) or column_name in {column["name"] for column in inspector.get_columns(table.name)}:
+                continue
+            column: Column = table.c[column_name]
+            preparer = self._engine.dialect.identifier_preparer
+            column_ddl: str = str(CreateColumn(column).compile(dialect = self._engine.dialect))
+            try:
+                with self._engine.begin() as connection:
+                    connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_ddl}"))
+            except DBAPIError: # Colonne ajoutée entre-temps par un autre worker.
+                if column_name not in {column["name"] for column in inspect(self._engine).get_columns(table.name)}:
+                    raise
+                continue
+            if column.default is not None and column.default.is_scalar:
+                with self._engine.begin() as connection:
+                    connection.execute(update(table).where(column.is_(None)).values({column_name: column.default.arg}))
+            print(f"Colonne {table.name}.{column_name} ajoutée à la base.")
+
     def _initialize_current_player(self) -> None:
         query = (
             select(self._current_player_table)
@@ -40,6 +189,7 @@ class DatabaseManager:
             current_player_table_data: dict[str, str|int] = {
             "id": str(uuid.uuid4()),
             "riot_ign": "",
+            "platform": "euw1",
             "duration": 0,
             "updated_at": db_timestamp
         }
@@ -49,13 +199,181 @@ class DatabaseManager:
             )
             self._execute_edit([query])
 
+    def _initialize_leaderboard(self) -> None:
+        """
+        Classement matérialisé des joueurs : lecture indexée par rank_position pour le site.
+        La table est créée et remplie en une seule passe si elle n'existe pas, puis maintenue de façon incrémentale par update_player.
+        """
+        if inspect(self._engine).has_table(self._leaderboard_table.name):
+            return
+        with self._named_lock(LEADERBOARD_LOCK_NAME): # Un seul processus crée et remplit la table au premier démarrage.
+            if not inspect(self._engine).has_table(self._leaderboard_table.name):
+                self._fill_leaderboard()
+
+    def _fill_leaderboard(self) -> None:
+        self._leaderboard_table.create(bind = self._engine)
+        games_count_query = (
+            select(
+                self._joint_table.c.riot_puuid,
+                func.count().label("total_games"),
+                func.sum(case((self._joint_table.c.is_solo, 1), else_ = 0)).label("solo_games")
+            )
+            .group_by(self._joint_table.c.riot_puuid)
+        )
+        players_query = (
+            select(self._players_table.c.riot_puuid, self._players_table.c.is_queued, self._players_table.c.points_count)
+        )
+        with self._engine.connect() as connection:
+            games_count: dict[str, Row] = {row.riot_puuid: row for row in connection.execute(games_count_query)}
+            players: List[Row] = connection.execute(players_query).fetchall()
+        if not players:
+            return
+        db_timestamp: datetime = datetime.now().replace(microsecond=0)
+        points_counts: dict[str, float] = { # Arrondi de l'algo : un FLOAT MySQL relu en simple précision ne casse pas les égalités.
+            player.riot_puuid: round(player.points_count or 0.0, 1) for player in players
+        }
+        ranked_points: List[float] = sorted((points_counts[player.riot_puuid] for player in players if not player.is_queued and points_counts[player.riot_puuid] > 0.0), reverse = True)
+        rank_positions: dict[float, int] = {}
+        for index, points_count in enumerate(ranked_points):
+            rank_positions.setdefault(points_count, index + 1) # 1 + nombre de joueurs devant, ex aequo au même rang.
+        leaderboard_table_data: List[dict[str, Any]] = []
+        for player in players:
+            player_games: Optional[Row] = games_count.get(player.riot_puuid)
+            solo_games: int = int(player_games.solo_games or 0) if player_games else 0
+            total_games: int = player_games.total_games if player_games else 0
+            status: str = self._get_leaderboard_status(player.is_queued, points_counts[player.riot_puuid])
+            leaderboard_table_data.append({
+                "id": str(uuid.uuid4()),
+                "riot_puuid": player.riot_puuid,
+                "rank_position": rank_positions[points_counts[player.riot_puuid]] if status == "processed" else None,
+                "points_count": points_counts[player.riot_puuid],
+                "status": status,
+                "missing_solo_games": max(0, self._games_min_solo - solo_games),
+                "missing_total_games": max(0, self._games_min_total - total_games),
+                "updated_at": db_timestamp
+            })
+        self._execute_edit([insert(self._leaderboard_table).values(leaderboard_table_data)])
+
+    @staticmethod
+    def _get_leaderboard_status(is_queued: bool, points_count: float) -> str:
+        if is_queued:
+            return "pending"
+        return "processed" if points_count > 0.0 else "failed"
+
+    def _count_player_games(self, connection: Connection, puuid: str) -> Tuple[int, int]:
+        query = (
+            select(self._joint_table.c.is_solo, func.count().label("games_number"))
+            .where(self._joint_table.c.riot_puuid == puuid)
+            .group_by(self._joint_table.c.is_solo)
+        )
+        games_number: dict[bool, int] = {bool(row.is_solo): row.games_number for row in connection.execute(query)}
+        return games_number.get(True, 0), sum(games_number.values())
+
+    def _update_leaderboard(self, connection: Connection, puuid: str, points_count: float, db_timestamp: datetime) -> None:
+        """
+        Mise à jour incrémentale du classement dans la transaction de update_player.
+        Rang = 1 + nombre de joueurs classés avec strictement plus de points : seuls les joueurs situés entre l'ancien et le nouveau score
+        du joueur voient leur rang décalé d'une place, sans retri de la table.
+        """
+        leaderboard = self._leaderboard_table
+        solo_games, total_games = self._count_player_games(connection, puuid)
+        status: str = self._get_leaderboard_status(False, points_count)
+        previous: Optional[Row] = connection.execute(
+            select(leaderboard.c.id, leaderboard.c.points_count, leaderboard.c.rank_position)
+            .where(leaderboard.c.riot_puuid == puuid)
+        ).fetchone()
+        old_points: Optional[float] = previous.points_count if previous is not None and previous.rank_position is not None else None
+        new_points: Optional[float] = points_count if status == "processed" else None
+        others_ranked = and_(leaderboard.c.riot_puuid != puuid, leaderboard.c.rank_position.is_not(None))
+        if old_points is not None and (new_points is None or new_points < old_points): # Le joueur descend ou sort du classement.
+            lower_bound = [] if new_points is None else [leaderboard.c.points_count >= new_points]
+            connection.execute(
+                update(leaderboard)
+                .where(others_ranked, leaderboard.c.points_count < old_points, *lower_bound)
+                .values(rank_position = leaderboard.c.rank_position - 1)
+            )
+        if new_points is not None and (old_points is None or new_points > old_points): # Le joueur monte ou entre dans le classement.
+            lower_bound = [] if old_points is None else [leaderboard.c.points_count >= old_points]
+            connection.execute(
+                update(leaderboard)
+                .where(others_ranked, leaderboard.c.points_count < new_points, *lower_bound)
+                .values(rank_position = leaderboard.c.rank_position + 1)
+            )
+        rank_position: Optional[int] = None
+        if new_points is not None:
+            rank_position = 1 + connection.execute(
+                select(func.count()).select_from(leaderboard).where(others_ranked, leaderboard.c.points_count > new_points)
+            ).scalar_one()
+        leaderboard_table_data: dict[str, Any] = {
+            "rank_position": rank_position,
+            "points_count": points_count,
+            "status": status,
+            "missing_solo_games": max(0, self._games_min_solo - solo_games),
+            "missing_total_games": max(0, self._games_min_total - total_games),
+            "updated_at": db_timestamp
+        }
+        if previous is None:
+            connection.execute(insert(leaderboard).values(id = str(uuid.uuid4()), riot_puuid = puuid, **leaderboard_table_data))
+        else:
+            connection.execute(update(leaderboard).where(leaderboard.c.id == previous.id).values(**leaderboard_table_data))
+
+    def mark_players_pending(self, puuids: List[str]) -> None:
+        """Passe les joueurs en file d'attente au statut "pending" dans le classement, leur rang actuel est conservé jusqu'au recalcul."""
+        if not puuids:
+            return
+        leaderboard = self._leaderboard_table
+        db_timestamp: datetime = datetime.now().replace(microsecond=0)
+        with self._leaderboard_transaction() as connection: # Lecture sous verrou : un autre worker ne peut pas insérer les mêmes joueurs entre-temps.
+            known_puuids: set[str] = set(connection.execute(
+                select(leaderboard.c.riot_puuid).where(leaderboard.c.riot_puuid.in_(puuids))
+            ).scalars())
+            connection.execute(
+                update(leaderboard)
+                .where(leaderboard.c.riot_puuid.in_(list(known_puuids)))
+                .where(leaderboard.c.status != "pending")
+                .values(status = "pending", updated_at = db_timestamp)
+            )
+            new_puuids: List[str] = [puuid for puuid in puuids if puuid not in known_puuids]
+            if new_puuids:
+                connection.execute(
+                    insert(leaderboard)
+                    .values([
+                        {"id": str(uuid.uuid4()), "riot_puuid": puuid, "rank_position": None, "points_count": 0.0, "status": "pending", "updated_at": db_timestamp}
+                        for puuid in new_puuids
+                    ])
+                )
+
+    def warm_up(self, connections_number: int) -> None:
+        """Ouvre les connexions du pool avant le premier joueur : aucune requête ne paie l'établissement d'une connexion MySQL."""
+        connections: List[Connection] = [self._engine.connect() for _ in range(connections_number)]
+        for connection in connections:
+            connection.close() # Retour au pool, la connexion reste ouverte.
+
     def get_players_in_queue(self) -> List[Row]:
+        games_number_query = ( # Nombre de games déjà enregistrées, pour l'estimation du coût de traitement.
+            select(self._joint_table.c.riot_puuid, func.count().label("games_number"))
+            .where(self._joint_table.c.riot_puuid.in_( # Seulement les joueurs en file, pas un parcours de toute la table.
+                select(self._players_table.c.riot_puuid).where(self._players_table.c.is_queued)
+            ))
+            .group_by(self._joint_table.c.riot_puuid)
+        ).subquery()
         query = (
-            select(self._players_table.c.riot_puuid, self._players_table.c.points_count)
+            select(
+                self._players_table.c.riot_puuid, self._players_table.c.points_count,
+                func.lower(func.trim(self._players_table.c.platform)).label("platform"), # Saisie manuelle : "EUW1", " euw1"...
+                self._players_table.c.points_count_recap, self._players_table.c.last_match_id, self._players_table.c.config_hash,
+                self._players_table.c.updated_at, func.coalesce(games_number_query.c.games_number, 0).label("games_number")
+            )
+            .outerjoin(games_number_query, games_number_query.c.riot_puuid == self._players_table.c.riot_puuid)
             .where(self._players_table.c.is_queued)
         )
         with self._engine.connect() as connection:
-            return connection.execute(query).fetchall()
+            players: List[Row] = connection.execute(query).fetchall()
+        for player in players:
+            if player.platform not in REGIONAL_ROUTES and player.riot_puuid not in self._invalid_platform_puuids:
+                self._invalid_platform_puuids.add(player.riot_puuid)
+                print(f"Joueur {player.riot_puuid} ignoré : plateforme {player.platform!r} inconnue (attendu : {', '.join(REGIONAL_ROUTES)}).")
+        return [player for player in players if player.platform in REGIONAL_ROUTES]
 
     def get_previous_games(self, puuid: str) -> List[Row]:
         games_list_query = (
@@ -70,23 +388,30 @@ class DatabaseManager:
         with self._engine.connect() as connection:
             return connection.execute(query).fetchall()
 
-    def update_current_player(self, ign: str, duration: int) -> None:
+    def update_current_player(self, ign: str, duration: int, platform: str) -> None:
         query = (
             select(self._current_player_table)
+            .where(self._current_player_table.c.platform == platform)
         )
         with self._engine.connect() as connection:
-            result: List[Row] = connection.execute(query).fetchone()
+            result: Optional[Row] = connection.execute(query).fetchone()
         db_timestamp: datetime = datetime.now().replace(microsecond=0)
         current_player_table_data: dict[str, str|int] = {
             "riot_ign": ign,
             "duration": duration,
             "updated_at": db_timestamp
         }
-        query = (
-            update(self._current_player_table)
-            .where(self._current_player_table.c.id == result.id)
-            .values(**current_player_table_data)
-        )
+        if result is None: # Première game traitée sur cette plateforme.
+            query = (
+                insert(self._current_player_table)
+                .values(id = str(uuid.uuid4()), platform = platform, **current_player_table_data)
+            )
+        else:
+            query = (
+                update(self._current_player_table)
+                .where(self._current_player_table.c.id == result.id)
+                .values(**current_player_table_data)
+            )
         self._execute_edit([query])
 
     def update_solo_games_to_premade_games(self, puuid: str, games_ids_list: List[str]) -> None:
@@ -166,11 +491,140 @@ class DatabaseManager:
             joint_table_query_list.append(joint_table_query)
         self._execute_edit(games_table_query_list + joint_table_query_list)
 
-    def update_player(self, puuid: str, points_count: float, points_count_recap: str) -> None:
+    def update_player(
+        self, puuid: str, points_count: float, points_count_recap: str, last_match_id: Optional[str] = None, config_hash: Optional[str] = None
+        ) -> None:
         db_timestamp: datetime = datetime.now().replace(microsecond=0)
         query = (
             update(self._players_table)
             .where(self._players_table.c.riot_puuid == puuid)
-            .values(is_queued = False, points_count = points_count, points_count_recap = points_count_recap, updated_at = db_timestamp)
+            .values(
+                is_queued = False, points_count = points_count, points_count_recap = points_count_recap,
+                last_match_id = last_match_id, config_hash = config_hash, updated_at = db_timestamp
+            )
+        )
+        with self._leaderboard_transaction() as connection:
+            connection.execute(query)
+            self._update_leaderboard(connection, puuid, points_count, db_timestamp)
+
+    def get_ladder_ranks(self, puuids: List[str], previous_season: bool = True) -> Dict[str, dict[str, str|int]]:
+        """Rangs solo/duo connus localement, au format de league-v4 (tier, rank, leaguePoints). Les joueurs absents du snapshot sont omis."""
+        if not puuids:
+            return {}
+        ladder: Table = self._previous_ladder_table if previous_season else self._ladder_table
+        query = (
+            select(ladder.c.riot_puuid, ladder.c.tier, ladder.c.rank, ladder.c.league_points)
+            .where(ladder.c.riot_puuid.in_(puuids))
+        )
+        with self._engine.connect() as connection:
+            return {
+                row.riot_puuid: {"tier": row.tier, "rank": row.rank, "leaguePoints": row.league_points}
+                for row in connection.execute(query)
+            }
+
+    def update_ladder(self, platform: str, entries: List[dict[str, Any]], db_timestamp: datetime) -> None:
+        """Enregistre une page du classement courant (entrées league-v4), les entrées déjà connues sont remplacées."""
+        ladder_table_data: Dict[str, dict[str, Any]] = {
+            entry["puuid"]: {
+                "riot_puuid": entry["puuid"],
+                "platform": platform,
+                "tier": entry["tier"],
+                "rank": entry["rank"],
+                "league_points": entry["leaguePoints"],
+                "updated_at": db_timestamp
+            }
+            for entry in entries if entry.get("puuid")
+        }
+        if not ladder_table_data:
+            return
+        with self._transaction() as connection:
+            connection.execute(delete(self._ladder_table).where(self._ladder_table.c.riot_puuid.in_(list(ladder_table_data))))
+            connection.execute(insert(self._ladder_table), list(ladder_table_data.values()))
+
+    def prune_ladder(self, platform: str, snapshot_start: datetime) -> None:
+        """Retire les joueurs absents du dernier snapshot complet de la plateforme (decay, passage en unranked...)."""
+        query = (
+            delete(self._ladder_table)
+            .where(self._ladder_table.c.platform == platform)
+            .where(self._ladder_table.c.updated_at < snapshot_start)
         )
         self._execute_edit([query])
+
+    def freeze_ladder(self, platform: str) -> None:
+        """Copie le classement courant de la plateforme dans le classement de la saison précédente, à lancer avant le reset de fin de saison."""
+        query_list = [
+            delete(self._previous_ladder_table).where(self._previous_ladder_table.c.platform == platform),
+            insert(self._previous_ladder_table).from_select(
+                [column.name for column in self._ladder_table.columns],
+                select(self._ladder_table).where(self._ladder_table.c.platform == platform)
+            )
+        ]
+        self._execute_edit(query_list)
+
+class AsyncDatabaseManager:
+    """
+    Accès non bloquant au DatabaseManager depuis la boucle asyncio.
+    Chaque requête est exécutée dans un pool de threads dimensionné sur le pool de connexions de l'engine,
+    la latence de la base de données se superpose ainsi aux requêtes HTTP en cours au lieu de les bloquer.
+    """
+
+    def __init__(self, database_manager: DatabaseManager, max_workers: int) -> None:
+        self._database_manager: DatabaseManager = database_manager
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers = max_workers, thread_name_prefix = "db")
+        self.corpus: Optional[TrafficCorpus] = None # Les lectures sont enregistrées avec les réponses API pour le rejeu hors ligne.
+
+    async def _run(self, method, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    def _record(self, key: str, response: Any) -> None:
+        if self.corpus is not None:
+            self.corpus.record(key, response)
+
+    async def warm_up(self, connections_number: int) -> None:
+        await self._run(self._database_manager.warm_up, connections_number)
+
+    async def get_players_in_queue(self) -> List[Row]:
+        return await self._run(self._database_manager.get_players_in_queue)
+
+    async def get_previous_games(self, puuid: str) -> List[Row]:
+        previous_games: List[Row] = await self._run(self._database_manager.get_previous_games, puuid)
+        self._record("db:get_previous_games", [row._asdict() for row in previous_games])
+        return previous_games
+
+    async def update_current_player(self, ign: str, duration: int, platform: str) -> None:
+        await self._run(self._database_manager.update_current_player, ign, duration, platform)
+
+    async def update_solo_games_to_premade_games(self, puuid: str, games_ids_list: List[str]) -> None:
+        await self._run(self._database_manager.update_solo_games_to_premade_games, puuid, games_ids_list)
+
+    async def get_existing_games(self, games_ids_list: List[str]) -> List[Row]:
+        existing_games: List[Row] = await self._run(self._database_manager.get_existing_games, games_ids_list)
+        self._record("db:get_existing_games", [row._asdict() for row in existing_games])
+        return existing_games
+
+    async def add_new_games(self, puuid: str, games: dict[str, dict[str, str|bool|float]]) -> None:
+        await self._run(self._database_manager.add_new_games, puuid, games)
+
+    async def update_player(
+        self, puuid: str, points_count: float, points_count_recap: str, last_match_id: Optional[str] = None, config_hash: Optional[str] = None
+        ) -> None:
+        self._record("db:update_player", {"points_count": points_count, "points_count_recap": points_count_recap})
+        await self._run(self._database_manager.update_player, puuid, points_count, points_count_recap, last_match_id, config_hash)
+
+    async def mark_players_pending(self, puuids: List[str]) -> None:
+        await self._run(self._database_manager.mark_players_pending, puuids)
+
+    async def get_ladder_ranks(self, puuids: List[str], previous_season: bool = True) -> Dict[str, dict[str, str|int]]:
+        ladder_ranks: Dict[str, dict[str, str|int]] = await self._run(self._database_manager.get_ladder_ranks, puuids, previous_season)
+        self._record(f"db:get_ladder_ranks:{','.join(sorted(puuids))}", ladder_ranks) # Clé par game : l'ordre des lookups varie au rejeu.
+        return ladder_ranks
+
+    async def update_ladder(self, platform: str, entries: List[dict[str, Any]], db_timestamp: datetime) -> None:
+        await self._run(self._database_manager.update_ladder, platform, entries, db_timestamp)
+
+    async def prune_ladder(self, platform: str, snapshot_start: datetime) -> None:
+        await self._run(self._database_manager.prune_ladder, platform, snapshot_start)
+
+    async def freeze_ladder(self, platform: str) -> None:
+        await self._run(self._database_manager.freeze_ladder, platform)
@@ -0,0 +1,79 @@
+"""
+Snapshot local du classement solo/duo, lu par Game.add_points_count avant tout appel réseau pour le rang des adversaires.
+Le classement courant de chaque plateforme est récupéré page par page (league-exp-v4) et ligues Master+ (league-v4) dans algo_ladder.
+Avec --freeze, le classement courant est copié dans algo_ladder_previous : à lancer juste avant le reset de fin de saison,
+la copie sert ensuite de rangs de la saison précédente pendant toute la saison suivante.
+
+Usage :
+    python ladder_snapshot.py [--platforms euw1 eun1] [--config config.json] [--freeze]
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from api_manager import APIManager, DEFAULT_PLATFORM
+from database_manager import DatabaseManager, AsyncDatabaseManager
+
+APEX_TIERS: List[str] = ["CHALLENGER", "GRANDMASTER", "MASTER"]
+TIERS: List[str] = ["DIAMOND", "EMERALD", "PLATINUM", "GOLD", "SILVER", "BRONZE", "IRON"]
+DIVISIONS: List[str] = ["I", "II", "III", "IV"]
+
+async def snapshot_platform(api_manager: APIManager, database_manager: AsyncDatabaseManager, platform: str) -> int:
+    """Remplace le classement courant de la plateforme, les pages sont enregistrées au fil de l'eau. Retourne le nombre d'entrées."""
+    snapshot_start: datetime = datetime.now().replace(microsecond=0)
+    entries_number: int = 0
+    for tier in APEX_TIERS:
+        league: Any = await api_manager.get_apex_league(tier, platform = platform) or {}
+        entries: List[dict[str, Any]] = [{**entry, "tier": tier} for entry in league.get("entries", [])] # Le tier est porté par la ligue.
+        await database_manager.update_ladder(platform, entries, snapshot_start)
+        entries_number += len(entries)
+    for tier in TIERS:
+        for division in DIVISIONS:
+            page: int = 1
+            entries = await api_manager.get_league_entries(tier, division, page, platform = platform)
+            while entries:
+                await database_manager.update_ladder(platform, entries, snapshot_start)
+                entries_number += len(entries)
+                print(f"\r{platform} {tier} {division} : page {page}, {entries_number} joueurs ", end="")
+                page += 1
+                entries = await api_manager.get_league_entries(tier, division, page, platform = platform)
+    print()
+    await database_manager.prune_ladder(platform, snapshot_start) # Seulement après un parcours complet, une erreur laisse l'ancien snapshot.
+    return entries_number
+
+async def snapshot(platforms: List[str], config: Dict[str, int|float], freeze: bool) -> None:
+    engine: Engine = create_engine(os.environ.get("DB_2R2T_PATH"))
+    database_manager: AsyncDatabaseManager = AsyncDatabaseManager(
+        DatabaseManager(engine, config["games_min_solo"], config["games_min_total"]), max_workers = 1
+    )
+    api_manager: APIManager = APIManager(os.environ.get("RIOT_API_KEY"))
+    try:
+        for platform in platforms:
+            entries_number: int = await snapshot_platform(api_manager, database_manager, platform)
+            print(f"Classement {platform} : {entries_number} entrées récupérées.")
+            if freeze:
+                await database_manager.freeze_ladder(platform)
+                print(f"Classement {platform} figé comme saison précédente.")
+    finally:
+        if api_manager.session is not None:
+            await api_manager.session.close()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description = "Snapshot local du classement solo/duo.")
+    parser.add_argument("--platforms", nargs = "+", default = [DEFAULT_PLATFORM], help = "Plateformes à récupérer.")
+    parser.add_argument("--config", default = os.environ.get("CONFIG_2R2T_PATH"), help = "Fichier de configuration de l'algo.")
+    parser.add_argument("--freeze", action = "store_true", help = "Copie le classement récupéré comme classement de la saison précédente.")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding = "utf-8") as file:
+        config: Dict[str, int|float] = json.load(file)
+    asyncio.run(snapshot(args.platforms, config, args.freeze))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
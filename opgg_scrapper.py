@@ -1,15 +1,30 @@
 import os
 import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
-from typing import List
+import functools
+import contextlib
+from typing import List, Optional, Tuple
 from utils import RequestError
+from api_manager import RateLimiter
+from traffic_corpus import TrafficCorpus
 import random
 
-username: str = os.environ.get("PROXY_USERNAME")
-password: str = os.environ.get("PROXY_PASSWORD")
-proxy_adress: str = os.environ.get("PROXY_ADRESS")
-proxy: str = "https://user-%s:%s@%s" % (username, password, proxy_adress)
+OPGG_REGIONS: dict[str, str] = { # Plateforme Riot Games -> région op.gg.
+    "euw1": "euw", "eun1": "eune", "tr1": "tr", "ru": "ru", "me1": "me",
+    "na1": "na", "br1": "br", "la1": "lan", "la2": "las",
+    "kr": "kr", "jp1": "jp",
+    "oc1": "oce", "ph2": "ph", "sg2": "sg", "th2": "th", "tw2": "tw", "vn2": "vn"
+}
+
+OPGG_ROUTE: str = "op.gg" # Limiteur commun à toutes les régions, les requêtes passent par le même proxy.
+OPGG_RATE_LIMITS: List[Tuple[int, float]] = [(10, 1)] # Rythme de pointe du traitement séquentiel des games (2 games par seconde, 5 adversaires).
+
+@functools.cache
+def get_proxy() -> str: # Construit au premier scrapping, pas à l'import.
+    username: str = os.environ.get("PROXY_USERNAME")
+    password: str = os.environ.get("PROXY_PASSWORD")
+    proxy_adress: str = os.environ.get("PROXY_ADRESS")
+    return "https://user-%s:%s@%s" % (username, password, proxy_adress)
 
 async def format_rank(rank_text: str) -> str:
     rank_text = rank_text.upper()
@@ -25,24 +40,38 @@ async def format_rank(rank_text: str) -> str:
 
 async def get_previous_rank(
     session: aiohttp.ClientSession, name: str, region: str = "euw",
-    conditions: List[str] = ["2024 S3", "2024 S2", "2024 S1"], timeout: int = random.uniform(5, 10), max_retries: int = 5
+    conditions: List[str] = ["2024 S3", "2024 S2", "2024 S1"], timeout: int = random.uniform(5, 10), max_retries: int = 5,
+    corpus: Optional[TrafficCorpus] = None, limiter: Optional[RateLimiter] = None
     ) -> str:
     encoded_name = name.replace(" ", "%20").replace("#", "-")
     url = f"https://{region}.op.gg/summoners/{region}/{encoded_name}"
+    if corpus is not None and corpus.is_replay:
+        return corpus.replay(url)
+    rank = await scrap_previous_rank(session, url, conditions, timeout, max_retries, limiter = limiter)
+    if corpus is not None:
+        corpus.record(url, rank)
+    return rank
+
+async def scrap_previous_rank(
+    session: aiohttp.ClientSession, url: str, conditions: List[str], timeout: int, max_retries: int, limiter: Optional[RateLimiter] = None
+    ) -> str:
+    from bs4 import BeautifulSoup # Import différé : BeautifulSoup n'est chargé que si le scrapping est utilisé.
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.5615.137 Safari/537.36"
     }
     if session is None:
         session = aiohttp.ClientSession()
+    status_code: int = 0 # Aucune réponse si toutes les tentatives échouent avant le serveur.
     for attempt in range(max_retries):
         try:
-            async with session.get(url, headers = headers, proxy = proxy) as response:
+            async with limiter or contextlib.nullcontext(), session.get(url, headers = headers, proxy = get_proxy()) as response:
+                status_code = response.status
                 if response.status != 200:
                     if response.status == 429:
                         await asyncio.sleep(timeout)
                         timeout *= 2
                     else:
-                        raise RequestError(f"Erreur HTTP {response.status} lors de la requête.", url = url, status_code = response.status)
+                        raise RequestError(f"Erreur HTTP {status_code} lors de la requête.", url = url, status_code = status_code)
                 else:
                     soup = BeautifulSoup(await response.text(), "html.parser")
                     # Cas 1 : Premier chemin avec condition "2024 S3"
@@ -81,6 +110,8 @@ async def get_previous_rank(
                                 return rank
                     # Si aucun rang ou LP correspondant n'est trouvé
                     return None
+        except asyncio.CancelledError:
+            raise
         except ConnectionResetError:
             if session is not None and not session.closed:
                 await session.close()
@@ -90,4 +121,4 @@ async def get_previous_rank(
         except:
             await asyncio.sleep(timeout)
             timeout *= 2
-    raise RequestError(f"Erreur HTTP {response.status} lors de la requête.", url = url, status_code = response.status)
\ No newline at end of file
+    raise RequestError(f"Erreur HTTP {status_code} lors de la requête.", url = url, status_code = status_code)
\ No newline at end of file
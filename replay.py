@@ -0,0 +1,110 @@
+"""
+Re-exécution hors ligne de Main.algo à partir d'un corpus capturé (CORPUS_2R2T_MODE="capture").
+Les réponses API, op.gg et les lectures en base de données sont resservies depuis le corpus, sans temporisation entre les requêtes.
+Aucune écriture n'est faite en base : le score recalculé est comparé à celui obtenu lors de la capture.
+
+Usage :
+    python replay.py corpus/<puuid>_<timestamp>.json.gz [--config config.json] [--profile]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import cProfile
+import pstats
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from algo import Main
+from api_manager import APIManager, DEFAULT_PLATFORM
+from traffic_corpus import TrafficCorpus
+from utils import no_pacing
+
+class ReplayDatabaseManager:
+    """Remplace AsyncDatabaseManager pendant le rejeu : lectures servies depuis le corpus, écritures conservées en mémoire."""
+
+    def __init__(self, corpus: TrafficCorpus) -> None:
+        self.corpus: TrafficCorpus = corpus
+        self.saved_games: Dict[str, Dict[str, Any]] = {}
+        self.player_result: Optional[Dict[str, Any]] = None
+
+    def _replay_rows(self, key: str) -> List[SimpleNamespace]:
+        return [SimpleNamespace(**row) for row in self.corpus.replay(key)]
+
+    async def get_players_in_queue(self) -> List[SimpleNamespace]:
+        return [player_from_corpus(self.corpus)]
+
+    async def mark_players_pending(self, puuids: List[str]) -> None:
+        pass
+
+    async def get_previous_games(self, puuid: str) -> List[SimpleNamespace]:
+        return self._replay_rows("db:get_previous_games")
+
+    async def get_existing_games(self, games_ids_list: List[str]) -> List[SimpleNamespace]:
+        return self._replay_rows("db:get_existing_games")
+
+    async def get_ladder_ranks(self, puuids: List[str], previous_season: bool = True) -> Dict[str, dict[str, str|int]]:
+        key: str = f"db:get_ladder_ranks:{','.join(sorted(puuids))}"
+        return self.corpus.replay(key) if key in self.corpus.responses else {} # Corpus antérieurs au snapshot local.
+
+    async def update_current_player(self, ign: str, duration: int, platform: str) -> None:
+        pass
+
+    async def update_solo_games_to_premade_games(self, puuid: str, games_ids_list: List[str]) -> None:
+        pass
+
+    async def add_new_games(self, puuid: str, games: dict[str, dict[str, str|bool|float]]) -> None:
+        self.saved_games.update(games)
+
+    async def update_player(
+        self, puuid: str, points_count: float, points_count_recap: str, last_match_id: Optional[str] = None, config_hash: Optional[str] = None
+        ) -> None:
+        self.player_result = {"points_count": points_count, "points_count_recap": points_count_recap}
+
+def player_from_corpus(corpus: TrafficCorpus, config_hash: Optional[str] = None) -> SimpleNamespace: # Valeurs par défaut des colonnes absentes des anciens corpus.
+    return SimpleNamespace(**{ # Corpus antérieurs à l'empreinte : capturés avec la config du rejeu.
+        "platform": DEFAULT_PLATFORM, "points_count_recap": None, "last_match_id": None, "config_hash": config_hash, **corpus.player
+    })
+
+async def replay(corpus: TrafficCorpus, config: Dict[str, int|float]) -> ReplayDatabaseManager:
+    database_manager: ReplayDatabaseManager = ReplayDatabaseManager(corpus)
+    api_manager: APIManager = APIManager("")
+    api_manager.corpus = corpus
+    main: Main = Main(database_manager = database_manager, api_manager = api_manager, **config)
+    main.corpus_mode = None
+    with no_pacing():
+        await main.algo(player_from_corpus(corpus, main.config_hash))
+    return database_manager
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description = "Rejeu hors ligne d'un corpus de traitement de joueur.")
+    parser.add_argument("corpus", help = "Fichier de corpus (.json.gz).")
+    parser.add_argument("--config", default = os.environ.get("CONFIG_2R2T_PATH"), help = "Fichier de configuration de l'algo.")
+    parser.add_argument("--profile", action = "store_true", help = "Affiche les fonctions les plus coûteuses (cProfile).")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding = "utf-8") as file:
+        config: Dict[str, int|float] = json.load(file)
+    corpus: TrafficCorpus = TrafficCorpus.load(args.corpus)
+    profiler: Optional[cProfile.Profile] = cProfile.Profile() if args.profile else None
+    start: float = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    database_manager: ReplayDatabaseManager = asyncio.run(replay(corpus, config))
+    if profiler is not None:
+        profiler.disable()
+    duration: float = time.perf_counter() - start
+    print(f"\nRejeu terminé en {duration:.2f} s, {len(database_manager.saved_games)} games sauvegardées.")
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    captured: Optional[Dict[str, Any]] = corpus.responses.get("db:update_player", [None])[-1]
+    replayed: Optional[Dict[str, Any]] = database_manager.player_result
+    print(f"Score capturé : {captured['points_count'] if captured else None} ; score rejoué : {replayed['points_count'] if replayed else None}")
+    if captured and replayed and captured != replayed:
+        print(f"Recap capturé : {captured['points_count_recap']}\nRecap rejoué  : {replayed['points_count_recap']}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import time
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.engine import Row
+from api_manager import APIManager
+from utils import TaskGroup, get_config_hash
+
+NEW_GAME_COST: int = 11 # Requêtes pour une nouvelle game : détails de la game puis compte et op.gg de chacun des 5 adversaires.
+STORED_GAME_COST: int = 1 # Requête pour revérifier une game déjà enregistrée (premades).
+PROBE_COUNT: int = 100 # Taille de la sonde, au-delà le nombre de nouvelles games est plafonné dans l'estimation.
+ESTIMATE_TTL: float = 600 # Secondes avant de resonder un joueur toujours en file.
+AGING_REQUESTS_PER_MINUTE: float = 50 # Réduction de la priorité par minute d'attente, évite la famine des gros traitements.
+UNCHANGED_COST: int = 1 # Joueur déjà traité dont la sonde count=1 confirme l'absence de nouvelle game, sonde reprise par Main.algo.
+
+class QueueScheduler:
+    """
+    Ordonnancement de la file d'attente d'une plateforme : le joueur au coût estimé le plus faible passe en premier (shortest job first).
+    Le coût est estimé en requêtes à partir des games déjà enregistrées et d'une sonde get_matches_list, puis réduit selon le temps
+    d'attente du joueur pour que les gros traitements finissent par passer.
+    """
+
+    def __init__(self, api_manager: APIManager, config: Dict[str, int|float]) -> None:
+        self.api_manager: APIManager = api_manager
+        self.config: Dict[str, int|float] = config
+        self.config_hash: str = get_config_hash(config)
+        self._estimates: Dict[str, Tuple[Any, float, int]] = {} # puuid -> (updated_at, date de la sonde, coût estimé).
+        self._first_seen: Dict[str, float] = {}
+        self._last_match_ids: Dict[str, Tuple[float, Optional[str]]] = {} # puuid -> (date de la sonde count=1, dernière game de la fenêtre).
+
+    async def _fetch_last_match_id(self, player_db: Row) -> Optional[str]:
+        last_match_ids: Optional[List[str]] = await self.api_manager.get_matches_list(
+            player_db.riot_puuid, end_time = self.config["max_date"], count = 1, platform = player_db.platform
+        )
+        return last_match_ids[0] if last_match_ids else None
+
+    async def get_last_match_id(self, player_db: Row) -> Optional[str]:
+        """
+        Dernière game de la fenêtre pour Main.algo : la sonde faite pour l'estimation est reprise si elle date de moins de ESTIMATE_TTL.
+        La reprise suppose une fenêtre close ("max_date" passée) : tant qu'elle est ouverte, une game jouée depuis la sonde changerait
+        la réponse, la sonde est donc refaite.
+        """
+        probe: Optional[Tuple[float, Optional[str]]] = self._last_match_ids.pop(player_db.riot_puuid, None)
+        if probe is not None and self.config["max_date"] <= time.time() and time.monotonic() - probe[0] <= ESTIMATE_TTL:
+            return probe[1]
+        return await self._fetch_last_match_id(player_db)
+
+    async def estimate_cost(self, player_db: Row) -> int:
+        update_time: int = (
+            self.config["min_date"] if player_db.points_count < 0.5 or player_db.updated_at is None else
+            max(self.config["min_date"], int(player_db.updated_at.timestamp()))
+        )
+        try:
+            if player_db.points_count >= 0.5 and player_db.last_match_id is not None and player_db.config_hash == self.config_hash:
+                # Joueur déjà traité avec la même config : sonde count=1 d'abord.
+                last_match_id: Optional[str] = await self._fetch_last_match_id(player_db)
+                self._last_match_ids[player_db.riot_puuid] = (time.monotonic(), last_match_id)
+                if last_match_id == player_db.last_match_id:
+                    return UNCHANGED_COST
+            new_games_ids: List[str] = await self.api_manager.get_matches_list(
+                player_db.riot_puuid, update_time = update_time, end_time = self.config["max_date"], count = PROBE_COUNT, platform = player_db.platform
+            )
+            new_games_number: int = len(new_games_ids or [])
+        except asyncio.CancelledError:
+            raise
+        except Exception: # Sonde en échec : estimation pessimiste, le traitement lui-même remontera l'erreur.
+            new_games_number = PROBE_COUNT
+        if new_games_number == 0 and player_db.games_number >= self.config["games_min_total"]:
+            return 0
+        return new_games_number * NEW_GAME_COST + player_db.games_number * STORED_GAME_COST
+
+    async def next_player(self, players_in_queue: List[Row]) -> Optional[Row]:
+        if not players_in_queue:
+            return None
+        now: float = time.monotonic()
+        queued_puuids: set[str] = {player_db.riot_puuid for player_db in players_in_queue}
+        for puuid in list(self._first_seen):
+            if puuid not in queued_puuids:
+                del self._first_seen[puuid]
+                self._estimates.pop(puuid, None)
+                self._last_match_ids.pop(puuid, None)
+        players_to_estimate: List[Row] = []
+        for player_db in players_in_queue:
+            self._first_seen.setdefault(player_db.riot_puuid, now)
+            estimate: Optional[Tuple[Any, float, int]] = self._estimates.get(player_db.riot_puuid)
+            if estimate is None or estimate[0] != player_db.updated_at or now - estimate[1] > ESTIMATE_TTL:
+                players_to_estimate.append(player_db)
+        async with TaskGroup() as task_group: # Sondes envoyées en parallèle, rythmées par le limiteur de la plateforme.
+            for player_db in players_to_estimate:
+                task_group.create_task(self.estimate_cost(player_db))
+        for player_db, cost in zip(players_to_estimate, task_group.results()):
+            self._estimates[player_db.riot_puuid] = (player_db.updated_at, now, cost)
+        def priority(player_db: Row) -> float:
+            waited_minutes: float = (now - self._first_seen[player_db.riot_puuid]) / 60
+            return self._estimates[player_db.riot_puuid][2] - AGING_REQUESTS_PER_MINUTE * waited_minutes
+        return min(players_in_queue, key = priority)
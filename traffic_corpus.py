@@ -0,0 +1,65 @@
+import gzip
+import json
+import time
+from typing import Any, Dict, List, Optional
+from utils import RequestError
+
+CAPTURE: str = "capture"
+REPLAY: str = "replay"
+
+class TrafficCorpus:
+    """
+    Corpus des réponses reçues pendant le traitement d'un joueur (API Riot Games, op.gg et lectures en base de données).
+    En mode capture, chaque réponse est enregistrée sous la clé de sa requête. En mode replay, les réponses sont resservies
+    dans le même ordre, sans réseau, pour relancer Main.algo hors ligne.
+    Le fichier est un JSON compressé en gzip.
+    """
+
+    def __init__(self, mode: str, path: str, player: Optional[Dict[str, Any]] = None) -> None:
+        self.mode: str = mode
+        self.path: str = path
+        self.player: Dict[str, Any] = {} if player is None else player
+        self.captured_at: int = int(time.time())
+        self.responses: Dict[str, List[Any]] = {}
+        self._replay_index: Dict[str, int] = {}
+
+    @property
+    def is_capture(self) -> bool:
+        return self.mode == CAPTURE
+
+    @property
+    def is_replay(self) -> bool:
+        return self.mode == REPLAY
+
+    def record(self, key: str, response: Any) -> Any:
+        if self.is_capture:
+            self.responses.setdefault(key, []).append(response)
+        return response
+
+    def replay(self, key: str) -> Any:
+        """Réponse suivante enregistrée pour cette clé, la dernière est resservie si la requête a été répétée plus de fois qu'à la capture."""
+        if key not in self.responses:
+            raise RequestError("Réponse absente du corpus.", url = key)
+        responses: List[Any] = self.responses[key]
+        index: int = self._replay_index.get(key, 0)
+        self._replay_index[key] = index + 1
+        return responses[min(index, len(responses) - 1)]
+
+    def save(self) -> None:
+        content: Dict[str, Any] = {
+            "version": 1,
+            "captured_at": self.captured_at,
+            "player": self.player,
+            "responses": self.responses
+        }
+        with gzip.open(self.path, "wt", encoding = "utf-8") as file:
+            json.dump(content, file, default = str)
+
+    @classmethod
+    def load(cls, path: str) -> "TrafficCorpus":
+        with gzip.open(path, "rt", encoding = "utf-8") as file:
+            content: Dict[str, Any] = json.load(file)
+        corpus: TrafficCorpus = cls(REPLAY, path, content["player"])
+        corpus.captured_at = content["captured_at"]
+        corpus.responses = content["responses"]
+        return corpus
@@ -1,3 +1,9 @@
+from contextlib import contextmanager
+from typing import Any, Coroutine, Dict, Iterator, List, Optional
+import asyncio
+import hashlib
+import json
+
 class RequestError(Exception):
     
     def __init__(self, message: str, url: str = "", status_code: int = 0):
@@ -6,4 +12,78 @@ class RequestError(Exception):
         self.status_code = status_code
 
     def __str__(self):
-        return f"{self.args[0]} (URL: {self.url}, Status: {self.status_code})"
\ No newline at end of file
+        return f"{self.args[0]} (URL: {self.url}, Status: {self.status_code})"
+
+class TaskGroup:
+    """
+    Groupe de tâches asyncio (asyncio.TaskGroup n'existe qu'à partir de Python 3.11).
+    La première exception d'une tâche annule les tâches sœurs encore en cours, ce qui ferme leurs réponses HTTP et libère leur place
+    dans les limiteurs, puis elle est relevée à la sortie du bloc "async with".
+    """
+
+    def __init__(self) -> None:
+        self._tasks: List[asyncio.Task] = []
+        self._error: Optional[BaseException] = None
+        self.cancelled_number: int = 0 # Tâches annulées avant leur fin, y compris celles dont la requête était déjà envoyée.
+
+    @property
+    def failed(self) -> bool:
+        return self._error is not None
+
+    def create_task(self, coroutine: Coroutine) -> asyncio.Task:
+        task: asyncio.Task = asyncio.create_task(coroutine)
+        task.add_done_callback(self._on_task_done)
+        self._tasks.append(task)
+        return task
+
+    def results(self) -> List[Any]:
+        return [task.result() for task in self._tasks]
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is None or self._error is not None:
+            return
+        self._error = task.exception()
+        self._cancel_pending()
+
+    def _cancel_pending(self) -> None:
+        for task in self._tasks:
+            if not task.done():
+                task.cancel()
+                self.cancelled_number += 1
+
+    async def __aenter__(self) -> "TaskGroup":
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, traceback: Any) -> bool:
+        if exc_type is not None: # Erreur ou annulation dans le bloc lui-même.
+            self._cancel_pending()
+        if self._tasks:
+            try:
+                await asyncio.wait(self._tasks)
+            except asyncio.CancelledError:
+                self._cancel_pending()
+                raise
+        for task in self._tasks: # Exceptions secondaires considérées comme lues.
+            if not task.cancelled():
+                task.exception()
+        if self.cancelled_number:
+            print(f"\nTâches annulées après une erreur : {self.cancelled_number}.")
+        if exc_type is None and self._error is not None:
+            raise self._error
+        return False
+
+def get_config_hash(config: Dict[str, int|float]) -> str:
+    """Empreinte de la config de l'algo, enregistrée avec chaque score : un score calculé avec une autre config n'est jamais repris tel quel."""
+    return hashlib.sha256(json.dumps(config, sort_keys = True).encode()).hexdigest()[:16]
+
+@contextmanager
+def no_pacing() -> Iterator[None]:
+    """Supprime les temporisations entre requêtes (asyncio.sleep) pour les exécutions hors ligne : rejeu d'un corpus et benchmarks."""
+    original_sleep = asyncio.sleep
+    async def no_sleep(delay: float, result: Any = None) -> Any:
+        return await original_sleep(0, result)
+    asyncio.sleep = no_sleep
+    try:
+        yield
+    finally:
+        asyncio.sleep = original_sleep